@@ -0,0 +1,62 @@
+import threading
+from typing import Dict, Tuple
+
+from ai_module.ai_models import TeacherChatAgent
+
+DEFAULT_MODEL = "models/gemini-2.5-flash"
+DEFAULT_TEMPERATURE = 0.2
+DEFAULT_MAX_TOKENS = 2048
+
+AgentKey = Tuple[str, float, int]
+
+# ---------- PROCESS-WIDE AGENT REGISTRY ----------
+# One TeacherChatAgent per (model, temperature, max_tokens), shared by every
+# Streamlit session in this process. The agent holds no conversation state:
+# each session passes its own history to TeacherChatAgent.chat.
+_agents: Dict[AgentKey, TeacherChatAgent] = {}
+_build_locks: Dict[AgentKey, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+def _make_key(model: str, temperature: float, max_tokens: int) -> AgentKey:
+    return (model, float(temperature), int(max_tokens))
+
+
+def get_teacher_agent(
+    model: str = DEFAULT_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+) -> TeacherChatAgent:
+    """Return the shared TeacherChatAgent for this configuration, building it once."""
+    key = _make_key(model, temperature, max_tokens)
+    agent = _agents.get(key)
+    if agent is not None:
+        return agent
+
+    with _registry_lock:
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+
+    # Build outside the registry lock so other configurations are not blocked.
+    with build_lock:
+        agent = _agents.get(key)
+        if agent is None:
+            agent = TeacherChatAgent(model=model, temperature=temperature, max_tokens=max_tokens)
+            with _registry_lock:
+                _agents[key] = agent
+    return agent
+
+
+def get_chat_llm(
+    model: str = DEFAULT_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+):
+    """Return the shared ChatGoogleGenerativeAI client for this configuration."""
+    return get_teacher_agent(model, temperature, max_tokens).llm
+
+
+def clear_agents() -> None:
+    """Drop every pooled agent, e.g. after rotating API keys."""
+    with _registry_lock:
+        _agents.clear()
+        _build_locks.clear()
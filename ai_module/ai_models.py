@@ -1,4 +1,6 @@
 import os
+import logging
+import tempfile
 from dotenv import load_dotenv
 from langchain.agents import initialize_agent, Tool
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -10,20 +12,55 @@ from langchain_community.tools import DuckDuckGoSearchRun
 from langchain.agents.agent_toolkits import NLAToolkit
 from langchain.chains.llm_math.base import LLMMathChain
 from langchain.memory import ConversationBufferMemory
+import threading
+import contextvars
+import time
+from typing import Iterator
+from ai_module.streaming import AgentStreamHandler, ChatEvent
+from ai_module.response_cache import get_response_cache
+from ai_module.tool_cache import get_tool_cache
+from ai_module.parallel_agent import ParallelAgentExecutor, ParallelConvoChatAgent, ParallelConvoOutputParser
 #for image generation
 import vertexai
 from vertexai.preview.vision_models import ImageGenerationModel
 
 #for Vision
 import base64
-from typing import Union, Optional
+import json
+import mimetypes
+from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from google import genai
 from google.genai import types
 from ai_module.gcloud_services import setup_google_credentials
+from ai_module.cache_store import content_hash
+from ai_module.image_io import ImageSource, read_image_bytes
+from ai_module.image_cache import ImageKey, get_image_cache
+from ai_module.scene_library import get_scene_library
+from ai_module.image_preprocess import VISION_OPTIONS, PreprocessOptions, detect_mime_type, preprocess_image
+
+logger = logging.getLogger(__name__)
+
+# Whether the current chat call opted into caching; the Summarizer and Story Generator
+# tools follow it, so a page that wants a fresh answer also gets fresh tool output.
+_use_response_cache: contextvars.ContextVar[bool] = contextvars.ContextVar("use_response_cache", default=False)
 
 class TeacherChatAgent:
-    def __init__(self, model="models/gemini-2.5-flash", temperature=0.2, max_tokens=2048):
+    def __init__(
+        self,
+        model="models/gemini-2.5-flash",
+        temperature=0.2,
+        max_tokens=2048,
+        cache_tool_responses=True,
+        parallel_tools=True,
+        tool_timeout=20.0,
+        time_budget=60.0,
+    ):
         self._load_env()
+        self.model_params = {"model": model, "temperature": temperature, "max_tokens": max_tokens}
+        self.response_cache = get_response_cache()
+        self.cache_tool_responses = cache_tool_responses
+        tool_cache = get_tool_cache()
         self.llm = ChatGoogleGenerativeAI(
             model=model,
             temperature=temperature,
@@ -32,13 +69,13 @@ class TeacherChatAgent:
 
         self.search_tool = Tool(
             name="Search",
-            func=GoogleSerperAPIWrapper().run,
+            func=tool_cache.wrap("Search", GoogleSerperAPIWrapper().run),
             description="Useful for answering current events, recent data, or factual queries."
         )
 
         self.wiki_tool = Tool(
             name="Wikipedia",
-            func=WikipediaAPIWrapper().run,
+            func=tool_cache.wrap("Wikipedia", WikipediaAPIWrapper().run),
             description="Useful for getting background on academic topics."
         )
 
@@ -51,12 +88,12 @@ class TeacherChatAgent:
 
         self.ddg_search = Tool(
             name="DuckDuckGoSearch",
-            func=DuckDuckGoSearchRun().run,
+            func=tool_cache.wrap("DuckDuckGoSearch", DuckDuckGoSearchRun().run),
             description="Useful for searching the internet or educational videos."
         )
         def summarize_text(text: str) -> str:
             prompt = f"Summarize this for school teachers in simple language:\n\n{text}"
-            return self.llm.predict(prompt)
+            return self._predict(prompt, kind="summarizer")
         
         self.summarizer_tool = Tool(
             name="Summarizer",
@@ -69,7 +106,7 @@ class TeacherChatAgent:
                 f"Write a short, engaging story for school children in India based on this topic:\n\n{topic}\n"
                 "Use age-appropriate language and include a moral at the end."
             )
-            return self.llm.predict(prompt)
+            return self._predict(prompt, kind="story_tool")
         
         # Story generator tool
         self.story_tool = Tool(
@@ -99,14 +136,33 @@ class TeacherChatAgent:
         ]
         self.memory = ConversationBufferMemory(memory_key="memory", k=5, return_messages=False)  
 
-        self.agent = initialize_agent(
-            tools=tools,
-            llm=self.llm,
-            agent="chat-conversational-react-description",
-            verbose=True,
-            # memory=self.memory,
-            agent_kwargs={"system_message": self.system_prompt}
-        )
+        if parallel_tools:
+            # Same conversational ReAct agent, but independent tool calls from one
+            # planning step run concurrently under per-tool and total time limits.
+            react_agent = ParallelConvoChatAgent.from_llm_and_tools(
+                llm=self.llm,
+                tools=tools,
+                system_message=self.system_prompt,
+                output_parser=ParallelConvoOutputParser(),
+            )
+            self.agent = ParallelAgentExecutor.from_agent_and_tools(
+                agent=react_agent,
+                tools=tools,
+                verbose=True,
+                tool_timeout=tool_timeout,
+                time_budget=time_budget,
+            )
+        else:
+            self.agent = initialize_agent(
+                tools=tools,
+                llm=self.llm,
+                agent="chat-conversational-react-description",
+                verbose=True,
+                # memory=self.memory,
+                agent_kwargs={"system_message": self.system_prompt}
+            )
+        # Ask the agent's LLM for streamed responses so callback handlers see tokens as they arrive.
+        self.agent.agent.llm_chain.llm_kwargs["stream"] = True
 
     def _load_env(self):
         load_dotenv(".env", override=False)
@@ -114,17 +170,76 @@ class TeacherChatAgent:
         os.environ["SERPER_API_KEY"] = os.getenv("SERPER_API_KEY")
 
     
-    def chat(self, user_input: str, chat_history=None, history = None) -> str:
-        """Process user input and return agent response."""
+    def _predict(self, prompt: str, kind: str) -> str:
+        """Single LLM call for the tools, served from the response cache when the chat call opted in."""
+        if not (self.cache_tool_responses and _use_response_cache.get()):
+            return self.llm.predict(prompt)
+        params = dict(self.model_params, kind=kind)
+        return self.response_cache.get_or_compute(prompt, params, lambda: self.llm.predict(prompt))
+
+    def _cache_params(self, chat_history) -> dict:
+        return dict(self.model_params, kind="chat", chat_history=chat_history or [])
+
+    def _build_inputs(self, user_input: str, chat_history=None, history=None) -> dict:
         if history is not None:
             prefix = f"remember the History {history}"
             user_input = prefix + user_input
         if chat_history is None:
             chat_history = []
-        return self.agent.run({
+        return {
             "input": user_input,
             "chat_history": chat_history
-        })
+        }
+
+    def chat(self, user_input: str, chat_history=None, history = None, use_cache=False, semantic_cache=False) -> str:
+        """
+        Process user input and return agent response.
+        With use_cache, identical (normalized) prompts are answered from the response
+        cache; semantic_cache additionally matches near-identical prompts by embedding.
+        """
+        inputs = self._build_inputs(user_input, chat_history, history)
+        token = _use_response_cache.set(use_cache)
+        try:
+            if not use_cache:
+                return self.agent.run(inputs)
+            return self.response_cache.get_or_compute(
+                inputs["input"],
+                self._cache_params(chat_history),
+                lambda: self.agent.run(inputs),
+                semantic=semantic_cache,
+            )
+        finally:
+            _use_response_cache.reset(token)
+
+    def stream_chat(self, user_input: str, chat_history=None, history=None, use_cache=False, semantic_cache=False) -> Iterator[ChatEvent]:
+        """
+        Same as chat, but yields ChatEvents: final-answer tokens as the LLM produces
+        them, plus tool_start/tool_end events for each tool step, then one final event.
+        """
+        inputs = self._build_inputs(user_input, chat_history, history)
+        if use_cache:
+            params = self._cache_params(chat_history)
+            cached = self.response_cache.lookup(inputs["input"], params, semantic=semantic_cache)
+            if cached is not None:
+                yield ChatEvent("token", cached)
+                yield ChatEvent("final", cached)
+                return
+        handler = AgentStreamHandler()
+
+        def run_agent():
+            # New threads start with a fresh context, so the opt-in is set here.
+            _use_response_cache.set(use_cache)
+            try:
+                result = self.agent.invoke(inputs, config={"callbacks": [handler]})
+                handler.finish(result["output"])
+            except Exception as e:
+                handler.fail(e)
+
+        threading.Thread(target=run_agent, daemon=True).start()
+        for event in handler.events():
+            if use_cache and event.kind == "final" and event.content:
+                self.response_cache.store(inputs["input"], params, event.content, semantic=semantic_cache)
+            yield event
 
     @staticmethod
     def format_history(messages: list[dict]) -> list[tuple[str, str]]:
@@ -143,6 +258,7 @@ class ImageSceneGenerator:
         safety_filter_level="block_few",
         add_watermark=False,
         person_generation="allow_all",
+        use_library=True,
     ):
         load_dotenv()
         self.project_id = project_id or os.getenv("PROJECT_ID")
@@ -152,7 +268,10 @@ class ImageSceneGenerator:
             raise ValueError("PROJECT_ID and LOCATION must be set in .env or passed to the constructor.")
 
         vertexai.init(project=self.project_id, location=self.location)
+        self.model_name = model_name
         self.model = ImageGenerationModel.from_pretrained(model_name)
+        # Earlier generations for the same prompt and settings are reused instead of calling Imagen.
+        self.library = get_scene_library() if use_library else None
 
         self.default_settings = {
             "number_of_images": number_of_images,
@@ -162,6 +281,16 @@ class ImageSceneGenerator:
             "person_generation": person_generation,
         }
 
+    def _settings(self, number_of_images=None, aspect_ratio=None, safety_filter_level=None,
+                  person_generation=None, add_watermark=None) -> dict:
+        return {
+            "number_of_images": number_of_images or self.default_settings["number_of_images"],
+            "aspect_ratio": aspect_ratio or self.default_settings["aspect_ratio"],
+            "safety_filter_level": safety_filter_level or self.default_settings["safety_filter_level"],
+            "person_generation": person_generation or self.default_settings["person_generation"],
+            "add_watermark": add_watermark if add_watermark is not None else self.default_settings["add_watermark"],
+        }
+
     def generate_images(
         self,
         prompt: str,
@@ -172,50 +301,152 @@ class ImageSceneGenerator:
         add_watermark=None,
         negative_prompt: str = "",
     ):
-        settings = {
-            "number_of_images": number_of_images or self.default_settings["number_of_images"],
-            "aspect_ratio": aspect_ratio or self.default_settings["aspect_ratio"],
-            "safety_filter_level": safety_filter_level or self.default_settings["safety_filter_level"],
-            "person_generation": person_generation or self.default_settings["person_generation"],
-            "add_watermark": add_watermark if add_watermark is not None else self.default_settings["add_watermark"],
-        }
+        settings = self._settings(number_of_images, aspect_ratio, safety_filter_level, person_generation, add_watermark)
 
-        print("Generating images with settings:", settings)
+        logger.info(f"Generating images with settings: {settings}")
 
         return self.model.generate_images(
             prompt=prompt,
             negative_prompt=negative_prompt,
             **settings
         )
-    
+
+    def _generate_one(self, prompt: str, negative_prompt: str, settings: dict) -> Optional[bytes]:
+        response = self.model.generate_images(
+            prompt=prompt,
+            negative_prompt=negative_prompt,
+            **dict(settings, number_of_images=1)
+        )
+        # Safety filtering can drop the image and return an empty list.
+        return self._png_bytes(response.images[0]) if response.images else None
+
+    @staticmethod
+    def _png_bytes(image) -> bytes:
+        """Read a GeneratedImage through its public save(); the SDK exposes no bytes accessor."""
+        with tempfile.TemporaryDirectory(prefix="imagen_") as tmp:
+            path = os.path.join(tmp, "image.png")
+            image.save(path)
+            with open(path, "rb") as f:
+                return f.read()
+
+    def iter_images(
+        self,
+        prompt: str,
+        number_of_images=None,
+        aspect_ratio=None,
+        safety_filter_level=None,
+        person_generation=None,
+        add_watermark=None,
+        negative_prompt: str = "",
+        max_concurrency: int = 4,
+        reuse: bool = True,
+    ) -> Iterator[Tuple[int, bytes]]:
+        """
+        Fan out into single-image Imagen requests running in parallel and yield
+        (slot, PNG bytes) in completion order, so the first image can be shown
+        while the rest are still rendering. Images already in the scene library
+        for this prompt and settings are yielded first; only the shortfall is
+        generated (and added to the library).
+        Filtered or failed slots are skipped; raises only if every request fails.
+        """
+        settings = self._settings(number_of_images, aspect_ratio, safety_filter_level, person_generation, add_watermark)
+        count = settings["number_of_images"]
+
+        cached = []
+        if self.library is not None:
+            request_key = self.library.request_key(prompt, negative_prompt, self.model_name, settings)
+            cached = self.library.lookup(request_key, count) if reuse else []
+        for slot, image_bytes in enumerate(cached):
+            yield slot, image_bytes
+        missing = count - len(cached)
+        if not missing:
+            return
+        logger.info(f"Generating images with settings: {settings} ({len(cached)} reused from the scene library)")
+
+        errors = []
+        with ThreadPoolExecutor(max_workers=max(1, min(missing, max_concurrency)), thread_name_prefix="imagen") as pool:
+            futures = {
+                pool.submit(self._generate_one, prompt, negative_prompt, settings): slot
+                for slot in range(len(cached), count)
+            }
+            for future in as_completed(futures):
+                try:
+                    image_bytes = future.result()
+                except Exception as e:
+                    logger.warning(f"Image generation failed: {e}")
+                    errors.append(e)
+                    continue
+                if image_bytes:
+                    if self.library is not None:
+                        self.library.add(request_key, prompt, settings["aspect_ratio"], image_bytes)
+                    yield futures[future], image_bytes
+        if errors and len(errors) == missing:
+            raise errors[0]
+
+
+def prepare_image_part(
+    image: ImageSource,
+    mime_type: Optional[str] = None,
+    options: Optional[PreprocessOptions] = VISION_OPTIONS,
+) -> types.Part:
+    """
+    GCS URIs are passed by reference; everything else is sent inline straight from
+    memory, downscaled and recompressed with `options` (None sends the bytes as-is).
+    The mime type is detected from the data unless given.
+    """
+    if isinstance(image, str) and image.startswith("gs://"):
+        return types.Part.from_uri(file_uri=image, mime_type=mime_type or mimetypes.guess_type(image)[0] or "image/jpeg")
+    if options is not None:
+        prepared = preprocess_image(image, options)
+        return types.Part.from_bytes(data=prepared.data, mime_type=prepared.mime_type)
+    data = read_image_bytes(image)
+    return types.Part.from_bytes(data=data, mime_type=mime_type or detect_mime_type(data, default="image/jpeg"))
+
+
+def cached_image_answer(cache, image: ImageSource, prompt_key: str, compute) -> str:
+    """
+    Answer from the image cache when the same (or a verified near-identical)
+    image was asked the same question before; otherwise call `compute(image)`
+    and remember it.
+    """
+    if cache is None or (isinstance(image, str) and image.startswith("gs://")):
+        return compute(image)
+    image = read_image_bytes(image)
+    key = cache.image_key(image)
+    cached = cache.lookup(key, prompt_key)
+    if cached is not None:
+        return cached["text"]
+    answer = compute(image)
+    if answer:
+        cache.store_result(key, prompt_key, {"text": answer})
+    return answer
+
 
 class GeminiVisionQA:
-    def __init__(self, location: str = "global", model: str = "gemini-2.5-flash-lite"):
+    def __init__(self, location: str = "global", model: str = "gemini-2.5-flash-lite", preprocess: bool = True, cache: bool = True):
         setup_google_credentials()
+        self.preprocess_options = VISION_OPTIONS if preprocess else None
+        self.image_cache = get_image_cache("vision") if cache else None
         self.project_id = os.getenv('VISION_PROJECT_ID')
         self.client = genai.Client(vertexai=True, project=self.project_id, location=location)
         self.model = model
 
-    def _prepare_image_part(self, image: Union[str, bytes], mime_type: str = "image/jpeg") -> types.Part:
+    def _prepare_image_part(self, image: ImageSource, mime_type: Optional[str] = None) -> types.Part:
         """
-        Accepts GS URI, local path, or raw bytes. Returns correct types.Part.
+        Accepts GS URI, local path, bytes, memoryview or file-like buffer. Returns correct types.Part.
         """
-        if isinstance(image, str):
-            if image.startswith("gs://"):
-                return types.Part.from_uri(file_uri=image, mime_type=mime_type)
-            elif os.path.exists(image):
-                with open(image, "rb") as f:
-                    data = f.read()
-                return types.Part.from_bytes(data=data, mime_type=mime_type)
-        elif isinstance(image, (bytes, bytearray)):
-            return types.Part.from_bytes(data=image, mime_type=mime_type)
-
-        raise ValueError("Image must be GCS URI, file path, or bytes.")
-
-    def ask_about_image(self, image: Union[str, bytes], prompt_text: str) -> str:
+        return prepare_image_part(image, mime_type, self.preprocess_options)
+
+    def ask_about_image(self, image: ImageSource, prompt_text: str) -> str:
         """
         Sends the visual + text prompt to Gemini Vision and returns the response.
         """
+        return cached_image_answer(
+            self.image_cache, image, f"{self.model}\n{prompt_text}",
+            lambda data: self._answer(data, prompt_text),
+        )
+
+    def _answer(self, image: ImageSource, prompt_text: str) -> str:
         image_part = self._prepare_image_part(image)
         text_part = types.Part.from_text(text=prompt_text)
 
@@ -233,15 +464,210 @@ class GeminiVisionQA:
         # The response text is available via response.text or first candidate
         return getattr(response, "text", "").strip()
 
+    def start_session(self, image: ImageSource, max_turns: int = 6) -> "VisionSession":
+        """Open a multi-turn conversation about one image; the image is prepared and registered once."""
+        return VisionSession(self.client, self.model, image, self.preprocess_options, max_turns=max_turns,
+                             image_cache=self.image_cache)
+
+
+class VisionSession:
+    """
+    A short multi-turn conversation about a single image.
+
+    The image is preprocessed once. When VISION_GCS_BUCKET is set it is uploaded
+    once (content-addressed, so re-opening the same image skips the upload) and
+    later turns reference it by URI instead of carrying the bytes. Without a
+    bucket the first turn sends the prepared bytes inline; when the conversation
+    continues, the image is moved into a Gemini context cache so follow-ups only
+    send text (inline is kept if the cache cannot be created, and restored if
+    the cache is rejected later, e.g. because it expired). Call close() when the
+    session is no longer needed so the cache is deleted right away.
+
+    Answers go through the shared image cache: a question asked before about
+    the same image (at the same point in the conversation) is not sent again.
+    """
+
+    CONTEXT_CACHE_TTL_SECONDS = 1800
+
+    def __init__(self, client, model: str, image: ImageSource,
+                 preprocess_options: Optional[PreprocessOptions] = VISION_OPTIONS, max_turns: int = 6,
+                 image_cache=None):
+        self.client = client
+        self.model = model
+        self.max_turns = max_turns
+        self.history: list[tuple[str, str]] = []
+        self.image_cache = image_cache
+        self.cached_content: Optional[str] = None
+        self._cache_expires_at = 0.0
+        self._context_cache_tried = False
+        if isinstance(image, str) and image.startswith("gs://"):
+            self.image_key = None
+            self.image_part = prepare_image_part(image)
+            self._inline = None
+            return
+        data = read_image_bytes(image)
+        self.image_key = image_cache.image_key(data) if image_cache is not None else None
+        self.image_part, self._inline = self._register(data, preprocess_options)
+
+    @staticmethod
+    def _register(data: bytes, options: Optional[PreprocessOptions]) -> Tuple[types.Part, Optional[Tuple[bytes, str]]]:
+        """Return the image part plus (bytes, mime type) when it is sent inline."""
+        bucket_name = os.getenv("VISION_GCS_BUCKET")
+        if options is not None:
+            prepared = preprocess_image(data, options)
+            data, mime_type = prepared.data, prepared.mime_type
+        else:
+            mime_type = detect_mime_type(data, default="image/jpeg")
+        if not bucket_name:
+            return types.Part.from_bytes(data=data, mime_type=mime_type), (data, mime_type)
+        try:
+            from google.cloud import storage
+            extension = mimetypes.guess_extension(mime_type) or ""
+            blob = storage.Client().bucket(bucket_name).blob(f"vision_sessions/{content_hash(data)}{extension}")
+            if not blob.exists():
+                blob.upload_from_string(data, content_type=mime_type)
+            return types.Part.from_uri(file_uri=f"gs://{bucket_name}/{blob.name}", mime_type=mime_type), None
+        except Exception as e:
+            logger.warning(f"GCS upload failed, sending image inline: {e}")
+            return types.Part.from_bytes(data=data, mime_type=mime_type), (data, mime_type)
+
+    def _use_context_cache(self) -> None:
+        """Move an inline image into a context cache once the conversation has a follow-up."""
+        if self._inline is None or self._context_cache_tried or not self.history:
+            return
+        self._context_cache_tried = True
+        try:
+            cached = self.client.caches.create(
+                model=self.model,
+                config=types.CreateCachedContentConfig(
+                    contents=[types.Content(role="user", parts=[self.image_part])],
+                    ttl=f"{self.CONTEXT_CACHE_TTL_SECONDS}s",
+                ),
+            )
+            self.cached_content = cached.name
+            self._cache_expires_at = time.monotonic() + self.CONTEXT_CACHE_TTL_SECONDS
+        except Exception as e:
+            # Small images fall under the minimum cacheable size; keep sending them inline.
+            logger.info(f"Context cache unavailable, keeping the image inline: {e}")
+
+    def _extend_context_cache(self) -> None:
+        """Push the cache's expiry back while the conversation is active (at most once per half TTL)."""
+        if self.cached_content is None:
+            return
+        if self._cache_expires_at - time.monotonic() > self.CONTEXT_CACHE_TTL_SECONDS / 2:
+            return
+        try:
+            self.client.caches.update(
+                name=self.cached_content,
+                config=types.UpdateCachedContentConfig(ttl=f"{self.CONTEXT_CACHE_TTL_SECONDS}s"),
+            )
+            self._cache_expires_at = time.monotonic() + self.CONTEXT_CACHE_TTL_SECONDS
+        except Exception as e:
+            # An expired cache is handled by _generate, which falls back to the inline image.
+            logger.info(f"Could not extend context cache {self.cached_content}: {e}")
+
+    def _drop_context_cache(self) -> None:
+        name, self.cached_content = self.cached_content, None
+        if name is None:
+            return
+        try:
+            self.client.caches.delete(name=name)
+        except Exception as e:
+            logger.info(f"Could not delete context cache {name}: {e}")
+
+    def close(self) -> None:
+        """Delete the context cache now instead of leaving it to expire."""
+        self._drop_context_cache()
+
+    def _generate(self, question: str, **config_kwargs):
+        contents = self._contents(question)
+        self._extend_context_cache()
+        try:
+            return self.client.models.generate_content(
+                model=self.model, contents=contents, config=self._config(**config_kwargs)
+            )
+        except Exception as e:
+            if self.cached_content is None:
+                raise
+            # The cache expired or was deleted: send the image inline from now on and retry once.
+            logger.info(f"Context cache {self.cached_content} was rejected, resending the image inline: {e}")
+            self._drop_context_cache()
+            return self.client.models.generate_content(
+                model=self.model, contents=self._contents(question), config=self._config(**config_kwargs)
+            )
+
+    def _config(self, **kwargs) -> types.GenerateContentConfig:
+        return types.GenerateContentConfig(cached_content=self.cached_content, **kwargs)
+
+    def _contents(self, question: str) -> list:
+        # Keep the last max_turns exchanges; the image rides on the oldest kept user turn
+        # unless it already lives in the context cache.
+        self._use_context_cache()
+        image_parts = [] if self.cached_content else [self.image_part]
+        turns = self.history[-self.max_turns:]
+        contents = []
+        for i, (q, a) in enumerate(turns):
+            parts = image_parts if i == 0 else []
+            contents.append(types.Content(role="user", parts=parts + [types.Part.from_text(text=q)]))
+            contents.append(types.Content(role="model", parts=[types.Part.from_text(text=a)]))
+        parts = [] if turns else image_parts
+        contents.append(types.Content(role="user", parts=parts + [types.Part.from_text(text=question)]))
+        return contents
+
+    def _prompt_key(self, question: str) -> str:
+        # First questions share entries with GeminiVisionQA.ask_about_image; follow-ups
+        # are keyed by the conversation so far, since their meaning depends on it.
+        turns = self.history[-self.max_turns:]
+        if not turns:
+            return f"{self.model}\n{question}"
+        return f"{self.model}\n{content_hash(json.dumps(turns, ensure_ascii=False))}\n{question}"
+
+    def ask(self, question: str) -> str:
+        prompt_key = self._prompt_key(question)
+        cached = self.image_cache.lookup(self.image_key, prompt_key) if self.image_cache is not None else None
+        if cached is not None:
+            answer = cached["text"]
+        else:
+            response = self._generate(question)
+            answer = getattr(response, "text", "").strip()
+            if answer and self.image_cache is not None:
+                self.image_cache.store_result(self.image_key, prompt_key, {"text": answer})
+        self.history.append((question, answer))
+        return answer
+
+    def ask_many(self, questions: list[str]) -> list[str]:
+        """Answer several questions about the image in a single request."""
+        questions = [q.strip() for q in questions if q.strip()]
+        if not questions:
+            return []
+        numbered = "\n".join(f"{i + 1}. {q}" for i, q in enumerate(questions))
+        prompt = (
+            "Answer each of the following questions about the image. "
+            f"Return a JSON array with exactly {len(questions)} strings, one answer per question, in order.\n"
+            f"{numbered}"
+        )
+        response = self._generate(prompt, response_mime_type="application/json", response_schema=list[str])
+        try:
+            answers = [str(a).strip() for a in json.loads(getattr(response, "text", "") or "[]")]
+        except json.JSONDecodeError:
+            answers = []
+        answers = (answers + ["(no answer returned)"] * len(questions))[:len(questions)]
+        self.history.extend(zip(questions, answers))
+        return answers
+
 class GeminiVisionQAWeb:
     def __init__(
         self,
         project_id: str,
         location: str = "global",
         model: str = "gemini-2.5-flash-lite",
-        serp_api_key: Optional[str] = os.getenv("SERPER_API_KEY")
+        serp_api_key: Optional[str] = os.getenv("SERPER_API_KEY"),
+        preprocess: bool = True,
+        cache: bool = True,
     ):
         setup_google_credentials()
+        self.preprocess_options = VISION_OPTIONS if preprocess else None
+        self.image_cache = get_image_cache("vision") if cache else None
         self.client = genai.Client(vertexai=True, project=project_id, location=location)
         self.model = model
         self.web_search_client = GoogleSerperAPIWrapper(serpapi_api_key=serp_api_key) if serp_api_key else None
@@ -251,33 +677,23 @@ class GeminiVisionQAWeb:
         os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
         self.serp_api_key = os.getenv("SERPER_API_KEY")
 
-    def _prepare_image_part(self, image: Union[str, bytes], mime_type: str = "image/jpeg") -> types.Part:
-        if isinstance(image, str):
-            if image.startswith("gs://"):
-                return types.Part.from_uri(file_uri=image, mime_type=mime_type)
-            elif os.path.exists(image):
-                with open(image, "rb") as f:
-                    data = f.read()
-                return types.Part.from_bytes(data=data, mime_type=mime_type)
-        elif isinstance(image, (bytes, bytearray)):
-            return types.Part.from_bytes(data=image, mime_type=mime_type)
-        raise ValueError("Image must be GCS URI, file path, or bytes.")
+    def _prepare_image_part(self, image: ImageSource, mime_type: Optional[str] = None) -> types.Part:
+        return prepare_image_part(image, mime_type, self.preprocess_options)
 
     def _web_search(self, query: str) -> Optional[str]:
         if not self.web_search_client:
             return None
         try:
-            results = self.web_search_client.run(query)
+            results = get_tool_cache().call("Search", query, self.web_search_client.run)
             return results.strip()
         except Exception as e:
-            print(f"Web search error: {e}")
+            logger.warning(f"Web search error: {e}")
             return None
 
-    def _generate_image_caption(self, image_part: types.Part) -> str:
-        caption_prompt = "Describe the main objects and scene in this image in a concise way."
+    def _generate(self, image_part: types.Part, text: str) -> str:
         contents = types.Content(
             role="user",
-            parts=[image_part, types.Part.from_text(text=caption_prompt)]
+            parts=[image_part, types.Part.from_text(text=text)]
         )
         response = self.client.models.generate_content(
             model=self.model,
@@ -286,40 +702,55 @@ class GeminiVisionQAWeb:
         )
         return getattr(response, "text", "").strip()
 
+    def _generate_image_caption(self, image_part: types.Part) -> str:
+        caption_prompt = "Describe the main objects and scene in this image in a concise way."
+        return self._generate(image_part, caption_prompt)
+
+    def _caption_key(self) -> str:
+        return f"{self.model}\ncaption"
+
+    def _cached_caption(self, image: ImageSource) -> Tuple[Optional[ImageKey], Optional[str]]:
+        """Return (image key, caption) when this image was captioned before."""
+        if self.image_cache is None or isinstance(image, str):
+            return None, None
+        key = self.image_cache.image_key(image)
+        cached = self.image_cache.lookup(key, self._caption_key())
+        return key, cached["text"] if cached else None
+
+    def ask_about_image(self, image: ImageSource, prompt_text: str, use_web_search: bool = False) -> str:
+        use_web_search = bool(use_web_search and self.web_search_client)
+        return cached_image_answer(
+            self.image_cache, image, f"{self.model}\nweb={use_web_search}\n{prompt_text}",
+            lambda data: self._answer(data, prompt_text, use_web_search),
+        )
 
-    def ask_about_image(self, image: Union[str, bytes], prompt_text: str, use_web_search: bool = False) -> str:
+    def _answer(self, image: ImageSource, prompt_text: str, use_web_search: bool) -> str:
         image_part = self._prepare_image_part(image)
 
-        # Step 1: Get image caption
-        image_caption = self._generate_image_caption(image_part)
-
-        # Step 2: Combine image caption + user question for web search context
-        enriched_prompt = f"Image Description: {image_caption}; Question: {prompt_text}"
+        # Without web search the caption would only restate what the model already sees: answer in one call.
+        if not use_web_search:
+            return self._generate(image_part, prompt_text)
 
-        if use_web_search and self.web_search_client:
-            print("Performing web search for additional context...")
-            web_results = self._web_search(enriched_prompt)
-            if web_results:
-                enriched_prompt = (
-                    f"Image Description: {image_caption} and Web search results:{web_results} and Answer the question based on the image and web info: {prompt_text}"
-                )
+        image_key, image_caption = self._cached_caption(image)
+        if image_caption:
+            web_results = self._web_search(f"Image Description: {image_caption}; Question: {prompt_text}")
+        else:
+            # Caption and search overlap; on a cold image the search uses the question alone.
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="vision") as pool:
+                caption_future = pool.submit(self._generate_image_caption, image_part)
+                search_future = pool.submit(self._web_search, prompt_text)
+                image_caption = caption_future.result()
+                web_results = search_future.result()
+            if image_caption and self.image_cache is not None:
+                self.image_cache.store_result(image_key, self._caption_key(), {"text": image_caption})
+
+        if web_results:
+            enriched_prompt = (
+                f"Image Description: {image_caption} and Web search results:{web_results} and Answer the question based on the image and web info: {prompt_text}"
+            )
         else:
             enriched_prompt = f"Image Description is {image_caption} and Question: {prompt_text}"
-        # print(f"Enriched Prompt: {enriched_prompt}")
-        # Step 3: Query Gemini Vision with image + enriched prompt
-        final_text_part = types.Part.from_text(text=str(enriched_prompt))
-        contents = types.Content(
-            role="user",
-            parts=[image_part, final_text_part]
-        )
-
-        final_response = self.client.models.generate_content(
-            model=self.model,
-            contents=[contents],
-            config=types.GenerateContentConfig()
-        )
-
-        return getattr(final_response, "text", "").strip()
+        return self._generate(image_part, enriched_prompt)
 
 
     
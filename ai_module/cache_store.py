@@ -0,0 +1,310 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ".sahayak_cache"
+
+
+# ---------- HELPERS ----------
+def cache_path(*parts: str) -> str:
+    """Return a path under the shared cache directory (SAHAYAK_CACHE_DIR), creating parents."""
+    base = os.getenv("SAHAYAK_CACHE_DIR", DEFAULT_CACHE_DIR)
+    path = os.path.join(base, *parts)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return path
+
+
+def content_hash(*parts) -> str:
+    """SHA-256 over the given parts; str parts are UTF-8 encoded, bytes are used as-is."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, (bytes, bytearray, memoryview)):
+            part = str(part).encode("utf-8")
+        digest.update(part)
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+class CacheStats:
+    """Thread-safe hit/miss counters shared by the cache layers."""
+
+    def __init__(self, *names: str):
+        self._lock = threading.Lock()
+        self._counts = {name: 0 for name in ("hits", "misses", "sets", "evictions") + names}
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts["hits"] + counts["misses"]
+        counts["hit_rate"] = counts["hits"] / lookups if lookups else 0.0
+        return counts
+
+
+# ---------- IN-MEMORY LRU ----------
+class LRUCache:
+    """Bounded in-memory LRU map with optional per-entry expiry."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+# ---------- REQUEST COALESCING ----------
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key share its result."""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result: Any = None
+            self.error: Optional[BaseException] = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, "SingleFlight._Call"] = {}
+
+    def do(self, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (result, shared); `shared` is True when another caller did the work."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = SingleFlight._Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = func()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+
+# ---------- SQLITE STORE ----------
+class SQLiteStore:
+    """
+    Blob store on a single SQLite file with per-entry TTL and LRU eviction by
+    entry count and/or total bytes. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        default_ttl: Optional[float] = None,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, value BLOB, meta TEXT, size INTEGER,"
+                " created_at REAL, accessed_at REAL, expires_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON entries(accessed_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_meta ON entries(meta)")
+            self._conn.commit()
+
+    def get_entry(self, key: str, touch: bool = True) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Return (value, meta) for a live entry; with touch, mark it recently used."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, meta, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.incr("misses")
+                return None
+            value, meta, expires_at = row
+            if expires_at is not None and expires_at < now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats.incr("misses")
+                return None
+            if touch:
+                self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+        self.stats.incr("hits")
+        return bytes(value), meta
+
+    def get(self, key: str, touch: bool = True) -> Optional[bytes]:
+        entry = self.get_entry(key, touch=touch)
+        return entry[0] if entry else None
+
+    def get_many(self, keys) -> Dict[str, bytes]:
+        """Return {key: value} for the live entries among `keys`, marking them recently used."""
+        keys = list(keys)
+        now = time.time()
+        found: Dict[str, bytes] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders})"
+                    " AND (expires_at IS NULL OR expires_at >= ?)",
+                    (*batch, now),
+                ).fetchall()
+                for key, value in rows:
+                    found[key] = bytes(value)
+            self._conn.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", [(now, key) for key in found]
+            )
+            self._conn.commit()
+        self.stats.incr("hits", len(found))
+        self.stats.incr("misses", len(keys) - len(found))
+        return found
+
+    def set(self, key: str, value: bytes, meta: Optional[str] = None, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, meta, size, created_at, accessed_at, expires_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(value), meta, len(value), now, now, expires_at),
+            )
+            self._evict_locked(now)
+            self._conn.commit()
+        self.stats.incr("sets")
+
+    def set_many(self, items, meta: Optional[str] = None, ttl: Optional[float] = None) -> None:
+        """Insert several (key, value) pairs in one transaction."""
+        now = time.time()
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl else None
+        rows = [
+            (key, sqlite3.Binary(value), meta, len(value), now, now, expires_at)
+            for key, value in items
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, meta, size, created_at, accessed_at, expires_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict_locked(now)
+            self._conn.commit()
+        self.stats.incr("sets", len(rows))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def delete_meta(self, meta: str) -> int:
+        """Delete every entry tagged with `meta`; returns the number removed."""
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM entries WHERE meta = ?", (meta,)).rowcount
+            self._conn.commit()
+        return removed
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None and (row[0] is None or row[0] >= time.time())
+
+    def scan(self, meta: Optional[str] = None) -> Iterator[Tuple[str, bytes, Optional[str]]]:
+        """Yield (key, value, meta) for live entries, optionally only those with the given meta."""
+        now = time.time()
+        query = "SELECT key, value, meta FROM entries WHERE (expires_at IS NULL OR expires_at >= ?)"
+        params: tuple = (now,)
+        if meta is not None:
+            query += " AND meta = ?"
+            params += (meta,)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for key, value, row_meta in rows:
+            yield key, bytes(value), row_meta
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _evict_locked(self, now: float) -> None:
+        evicted = self._conn.execute(
+            "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?", (now,)
+        ).rowcount
+        if self.max_entries is not None:
+            count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count > self.max_entries:
+                evicted += self._conn.execute(
+                    "DELETE FROM entries WHERE key IN ("
+                    " SELECT key FROM entries ORDER BY accessed_at ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                ).rowcount
+        if self.max_bytes is not None:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                freed = 0
+                victims = []
+                for key, size in self._conn.execute(
+                    "SELECT key, size FROM entries ORDER BY accessed_at ASC"
+                ):
+                    if total - freed <= self.max_bytes:
+                        break
+                    victims.append((key,))
+                    freed += size
+                self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+                evicted += len(victims)
+        if evicted:
+            self.stats.incr("evictions", evicted)
+            logger.info(f"Evicted {evicted} entries from {self.path}")
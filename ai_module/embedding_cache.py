@@ -0,0 +1,61 @@
+import threading
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ai_module.cache_store import SQLiteStore, cache_path, content_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+
+class EmbeddingCache:
+    """
+    Chunk-level embedding cache shared by every document and session. Vectors are
+    keyed by hash(model name + chunk text) and stored as float32 blobs.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.store = SQLiteStore(path or cache_path("embeddings.sqlite"), max_bytes=max_bytes)
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return content_hash(model, text)
+
+    def get_many(self, model: str, texts: Iterable[str]) -> Dict[str, List[float]]:
+        """Return {text: vector} for the texts already embedded with this model."""
+        keys = {self.key(model, text): text for text in texts}
+        found = self.store.get_many(keys)
+        return {keys[key]: np.frombuffer(blob, dtype=np.float32).tolist() for key, blob in found.items()}
+
+    def set_many(self, model: str, pairs: Iterable[Tuple[str, List[float]]]) -> None:
+        self.store.set_many(
+            ((self.key(model, text), np.asarray(vector, dtype=np.float32).tobytes()) for text, vector in pairs),
+            meta=model,
+        )
+
+    def report(self) -> dict:
+        """Hit rate for this process plus the number of vectors and bytes on disk."""
+        stats = self.store.stats.as_dict()
+        return {
+            "hits": stats["hits"],
+            "misses": stats["misses"],
+            "hit_rate": stats["hit_rate"],
+            "entries": len(self.store),
+            "bytes_stored": self.store.total_bytes(),
+        }
+
+
+_shared_cache: Optional[EmbeddingCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide EmbeddingCache used by both ingestion paths."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = EmbeddingCache()
+        return _shared_cache
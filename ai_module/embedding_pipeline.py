@@ -0,0 +1,220 @@
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from ai_module.cache_store import SQLiteStore, cache_path, content_hash
+from ai_module.embedding_cache import get_embedding_cache
+
+logger = logging.getLogger(__name__)
+
+# Google's batch embedding endpoint accepts at most 100 texts per request.
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_WORKERS = 4
+MAX_RETRIES = 8
+CHECKPOINT_TTL = 3 * 24 * 3600
+# Chunks handed to the vector store per add call when ingesting a stream of documents.
+INGEST_WINDOW = 500
+_QUOTA_MARKERS = ("429", "resource has been exhausted", "resourceexhausted", "quota", "rate limit")
+
+
+def is_quota_error(error: BaseException) -> bool:
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in _QUOTA_MARKERS)
+
+
+def embedding_model_name(embeddings) -> str:
+    return getattr(embeddings, "model", None) or type(embeddings).__name__
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency gate that backs off on quota errors: each throttle halves the
+    number of parallel requests and doubles the pause before the next one;
+    successes slowly restore both.
+    """
+
+    def __init__(self, max_concurrency: int, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.max_concurrency = max_concurrency
+        self.allowed = max_concurrency
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.delay = 0.0
+        self._active = 0
+        self._resume_at = 0.0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                wait = self._resume_at - time.monotonic()
+                if wait <= 0 and self._active < self.allowed:
+                    self._active += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, throttled: bool = False) -> None:
+        with self._cond:
+            self._active -= 1
+            if throttled:
+                self.allowed = max(1, self.allowed // 2)
+                self.delay = min(self.max_delay, max(self.base_delay, self.delay * 2))
+                self._resume_at = time.monotonic() + self.delay
+                self._successes = 0
+                logger.warning(f"Embedding quota hit; backing off {self.delay:.1f}s, concurrency {self.allowed}")
+            else:
+                self._successes += 1
+                if self._successes >= 5:
+                    self._successes = 0
+                    self.allowed = min(self.max_concurrency, self.allowed + 1)
+                    self.delay = self.delay / 2 if self.delay > self.base_delay else 0.0
+            self._cond.notify_all()
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper for ingestion. It dedupes identical chunks, skips chunks
+    already in the shared EmbeddingCache, and embeds the rest in fixed-size
+    batches across a bounded worker pool with adaptive backoff.
+
+    Finished vectors land in the shared cache, so an interrupted ingest resumes
+    where it stopped. With use_cache=False, a `job_id` enables a private
+    checkpoint that serves the same purpose.
+    """
+
+    def __init__(
+        self,
+        base: Embeddings,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        job_id: Optional[str] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        use_cache: bool = True,
+    ):
+        self.base = base
+        self.model = embedding_model_name(base)
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.job_id = job_id
+        self.on_progress = on_progress
+        self.limiter = AdaptiveLimiter(max_workers)
+        self.cache = get_embedding_cache() if use_cache else None
+        self.checkpoint = (
+            SQLiteStore(cache_path("ingest_checkpoints.sqlite"), default_ttl=CHECKPOINT_TTL)
+            if job_id and self.cache is None else None
+        )
+        self.cache_hits = 0
+
+    def _checkpoint_key(self, text: str) -> str:
+        return content_hash(self.job_id, self.model, text)
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        for attempt in range(MAX_RETRIES):
+            self.limiter.acquire()
+            try:
+                vectors = self.base.embed_documents(batch)
+            except Exception as e:
+                throttled = is_quota_error(e)
+                self.limiter.release(throttled=throttled)
+                if not throttled or attempt == MAX_RETRIES - 1:
+                    raise
+                continue
+            self.limiter.release()
+            if self.cache is not None:
+                self.cache.set_many(self.model, zip(batch, vectors))
+            elif self.checkpoint is not None:
+                self.checkpoint.set_many(
+                    ((self._checkpoint_key(text), np.asarray(vector, dtype=np.float32).tobytes())
+                     for text, vector in zip(batch, vectors)),
+                    meta=self.job_id,
+                )
+            return vectors
+        raise RuntimeError("unreachable")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        unique = list(dict.fromkeys(texts))
+        vectors: Dict[str, List[float]] = {}
+
+        if self.cache is not None:
+            vectors.update(self.cache.get_many(self.model, unique))
+            self.cache_hits += len(vectors)
+        elif self.checkpoint is not None:
+            for text in unique:
+                blob = self.checkpoint.get(self._checkpoint_key(text))
+                if blob is not None:
+                    vectors[text] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if vectors:
+                logger.info(f"Resuming ingest {self.job_id[:12]}: {len(vectors)}/{len(unique)} chunks already embedded")
+
+        todo = [text for text in unique if text not in vectors]
+        batches = [todo[i:i + self.batch_size] for i in range(0, len(todo), self.batch_size)]
+        done = len(vectors)
+        if self.on_progress:
+            self.on_progress(done, len(unique))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="embed") as pool:
+            futures = [(batch, pool.submit(self._embed_batch, batch)) for batch in batches]
+            for batch, future in futures:
+                for text, vector in zip(batch, future.result()):
+                    vectors[text] = vector
+                done += len(batch)
+                if self.on_progress:
+                    self.on_progress(done, len(unique))
+
+        logger.info(
+            f"Embedded {len(todo)} new chunks "
+            f"({len(unique) - len(todo)} cached, {len(texts) - len(unique)} duplicates skipped)"
+        )
+        return [vectors[text] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
+
+    def clear_checkpoint(self) -> None:
+        """Forget checkpointed vectors once the ingest has been committed to the index."""
+        if self.checkpoint is not None:
+            self.checkpoint.delete_meta(self.job_id)
+
+
+def iter_windows(items: Iterable, size: int) -> Iterator[list]:
+    """Group an iterable into lists of at most `size` items."""
+    window = []
+    for item in items:
+        window.append(item)
+        if len(window) >= size:
+            yield window
+            window = []
+    if window:
+        yield window
+
+
+def ingest_documents(docs, embeddings, persist_directory, vectorstore_cls, job_id=None,
+                     on_progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                     window: int = INGEST_WINDOW, **pipeline_kwargs):
+    """
+    Build a vector store from `docs` through BatchedEmbeddings. `docs` may be any
+    iterable (e.g. a generator of PDF chunks); it is consumed `window` chunks at a
+    time so memory stays flat. on_progress receives (chunks_done, total) where
+    total is None for unsized inputs. Returns None when there were no documents.
+    """
+    total = len(docs) if hasattr(docs, "__len__") else None
+    base = [0]
+
+    def report(done, _window_total):
+        if on_progress:
+            on_progress(base[0] + done, total)
+
+    pipeline = BatchedEmbeddings(embeddings, job_id=job_id, on_progress=report, **pipeline_kwargs)
+    vectordb = None
+    for batch in iter_windows(docs, window):
+        if vectordb is None:
+            vectordb = vectorstore_cls(persist_directory=persist_directory, embedding_function=pipeline)
+        vectordb.add_documents(batch)
+        base[0] += len(batch)
+    pipeline.clear_checkpoint()
+    return vectordb
@@ -1,6 +1,13 @@
 import os
+import re
 import logging
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Optional, Tuple
 from google.cloud import vision
+from ai_module.image_io import ImageSource, read_image_bytes
+from ai_module.image_cache import ImageKey, get_image_cache
+from ai_module.tts_cache import get_tts_cache
+from ai_module.image_preprocess import OCR_OPTIONS, PreprocessOptions, PreparedImage, preprocess_image
 from google.cloud import texttospeech
 from dotenv import load_dotenv
 
@@ -9,6 +16,10 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Vision's synchronous batch_annotate_images accepts at most 16 images per request.
+OCR_BATCH_SIZE = 16
+OCR_MAX_CONCURRENCY = 4
+
 
 # ---------- CREDENTIALS UTILITY ----------
 def setup_google_credentials():
@@ -43,17 +54,55 @@ def setup_google_credentials():
 
 # ---------- OCR MODULE ----------
 class GoogleOCR:
-    def __init__(self):
+    def __init__(self, preprocess: bool = True, preprocess_options: PreprocessOptions = OCR_OPTIONS, cache: bool = True):
         setup_google_credentials()
         self.client = vision.ImageAnnotatorClient()
+        self.preprocess_options = preprocess_options if preprocess else None
+        # Re-uploaded pages skip the API call; matching is on exact bytes unless
+        # near-duplicate matching is enabled with SAHAYAK_PHASH_OCR.
+        self.cache = get_image_cache("ocr") if cache else None
+
+    def _cached(self, image: bytes) -> Tuple[Optional[ImageKey], Optional[dict]]:
+        if self.cache is None:
+            return None, None
+        key = self.cache.image_key(image)
+        cached = self.cache.lookup(key)
+        if cached is None:
+            return key, None
+        return key, {**cached, "raw_response": None, "error": None, "bytes_saved": 0, "cached": True}
+
+    def _remember(self, key: Optional[ImageKey], result: dict) -> None:
+        # Empty text is not cached: it is as likely a bad capture as a blank page.
+        if self.cache is not None and not result.get("error") and result.get("text"):
+            self.cache.store_result(key, "", {"text": result["text"], "locale": result.get("locale")})
+
+    def _prepare(self, image: ImageSource) -> PreparedImage:
+        """Downscale/recompress with OCR-safe settings, or pass the bytes through when disabled."""
+        if self.preprocess_options is None:
+            data = read_image_bytes(image)
+            return PreparedImage(data=data, mime_type="", original_bytes=len(data))
+        return preprocess_image(image, self.preprocess_options)
+
+    @staticmethod
+    def _to_result(response) -> dict:
+        annotations = response.text_annotations
+        return {
+            "text": annotations[0].description.strip() if annotations else "",
+            "locale": annotations[0].locale if annotations else None,
+            "raw_response": response,
+            "error": response.error.message or None,
+        }
 
-    def extract_text(self, image_path: str):
-        """Extracts text from the given image file using Google Vision API."""
+    def extract_text(self, image: ImageSource):
+        """Extracts text from an image path, bytes, memoryview or file-like buffer using Google Vision API."""
         try:
-            with open(image_path, "rb") as f:
-                content = f.read()
+            image = read_image_bytes(image)
+            key, cached = self._cached(image)
+            if cached is not None:
+                return cached
+            prepared = self._prepare(image)
 
-            image = vision.Image(content=content)
+            image = vision.Image(content=prepared.data)
             response = self.client.text_detection(image=image)
 
             if response.error.message:
@@ -63,43 +112,249 @@ class GoogleOCR:
             extracted_text = annotations[0].description.strip() if annotations else ""
             logger.info(f"Extracted {len(extracted_text)} characters from image.")
 
-            return {
+            result = {
                 "text": extracted_text,
-                "raw_response": response
+                "locale": annotations[0].locale if annotations else None,
+                "raw_response": response,
+                "bytes_saved": prepared.bytes_saved
             }
+            self._remember(key, result)
+            return result
         except Exception as e:
             logger.error(f"OCR extraction failed: {e}")
             raise
 
+    def _annotate_chunk(self, images: List[ImageSource]) -> List[dict]:
+        """One batch_annotate_images request; errors are reported per image, not raised."""
+        requests, results = [], [None] * len(images)
+        positions, saved = [], []
+        for i, image in enumerate(images):
+            try:
+                prepared = self._prepare(image)
+            except Exception as e:
+                results[i] = {"text": "", "locale": None, "raw_response": None, "error": str(e)}
+                continue
+            positions.append(i)
+            saved.append(prepared.bytes_saved)
+            requests.append(vision.AnnotateImageRequest(
+                image=vision.Image(content=prepared.data),
+                features=[vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)],
+            ))
+        if requests:
+            try:
+                batch = self.client.batch_annotate_images(requests=requests)
+                for i, bytes_saved, response in zip(positions, saved, batch.responses):
+                    results[i] = self._to_result(response)
+                    results[i]["bytes_saved"] = bytes_saved
+            except Exception as e:
+                logger.error(f"OCR batch request failed: {e}")
+                for i in positions:
+                    results[i] = {"text": "", "locale": None, "raw_response": None, "error": str(e)}
+        return results
+
+    def iter_extract_texts(
+        self,
+        images: List[ImageSource],
+        batch_size: int = OCR_BATCH_SIZE,
+        max_concurrency: int = OCR_MAX_CONCURRENCY,
+    ) -> Iterator[Tuple[int, dict]]:
+        """
+        OCR many images (any ImageSource) with batched requests sent in parallel.
+        Yields (index, result) as each batch finishes; results carry an "error"
+        entry instead of raising, so one bad image does not sink the rest.
+        Cached pages are yielded first and never sent.
+        """
+        todo, keys = [], {}
+        for i, image in enumerate(images):
+            try:
+                image = read_image_bytes(image)
+            except Exception:
+                todo.append((i, image))  # _annotate_chunk reports the error
+                continue
+            keys[i], cached = self._cached(image)
+            if cached is not None:
+                yield i, cached
+            else:
+                todo.append((i, image))
+
+        chunks = [todo[start:start + batch_size] for start in range(0, len(todo), batch_size)]
+        if not chunks:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(chunks))), thread_name_prefix="ocr") as pool:
+            futures = {pool.submit(self._annotate_chunk, [image for _, image in chunk]): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                for (i, _), result in zip(futures[future], future.result()):
+                    self._remember(keys.get(i), result)
+                    yield i, result
+
+    def extract_texts(self, images: List[ImageSource], **kwargs) -> List[dict]:
+        """Batch OCR; returns one result per image, in input order."""
+        results: List[Optional[dict]] = [None] * len(images)
+        for index, result in self.iter_extract_texts(images, **kwargs):
+            results[index] = result
+        failed = sum(1 for r in results if r["error"])
+        logger.info(f"OCR batch: {len(images) - failed}/{len(images)} images succeeded.")
+        return results
+
 
 # ---------- TEXT TO SPEECH MODULE ----------
+# Google TTS rejects requests over 5000 bytes of input; leave headroom.
+TTS_MAX_BYTES = 4800
+TTS_MAX_CONCURRENCY = 4
+# Sentence ends for Latin scripts plus the Devanagari danda/double danda used by Hindi, Marathi, etc.
+_SENTENCE_END = re.compile(r"(?<=[.!?\u0964\u0965])\s+|\n+")
+_CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+
+
+def _utf8_len(text: str) -> int:
+    return len(text.encode("utf-8"))
+
+
+def _hard_split(text: str, max_bytes: int) -> List[str]:
+    """Split on whitespace, and inside words only as a last resort, never mid-character."""
+    pieces, current = [], ""
+    for word in text.split(" "):
+        candidate = f"{current} {word}" if current else word
+        if _utf8_len(candidate) <= max_bytes:
+            current = candidate
+            continue
+        if current:
+            pieces.append(current)
+        while _utf8_len(word) > max_bytes:
+            cut = len(word.encode("utf-8")[:max_bytes].decode("utf-8", errors="ignore"))
+            pieces.append(word[:cut])
+            word = word[cut:]
+        current = word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_for_tts(text: str, max_bytes: int = TTS_MAX_BYTES) -> List[str]:
+    """
+    Split text into chunks of at most `max_bytes` UTF-8 bytes, breaking at
+    sentence ends where possible, then clause ends, then spaces. Sentences are
+    packed together so the number of requests stays small.
+    """
+    units: List[str] = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if _utf8_len(sentence) <= max_bytes:
+            units.append(sentence)
+            continue
+        for clause in _CLAUSE_END.split(sentence):
+            units.extend([clause] if _utf8_len(clause) <= max_bytes else _hard_split(clause, max_bytes))
+
+    chunks, current = [], ""
+    for unit in units:
+        candidate = f"{current} {unit}" if current else unit
+        if _utf8_len(candidate) <= max_bytes:
+            current = candidate
+        else:
+            chunks.append(current)
+            current = unit
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class SynthesisJob:
+    """
+    A background iter_synthesize run. `segments` fills in reading order as each
+    chunk is ready, so playback can start on the first one while the rest are
+    still being synthesized.
+    """
+
+    def __init__(self, tts: "GoogleTTS", text: str, language_code: str, gender: str, executor: Executor):
+        self.total = len(split_for_tts(text))
+        self.segments: List[bytes] = []
+        self.future = executor.submit(self._run, tts, text, language_code, gender)
+
+    def _run(self, tts: "GoogleTTS", text: str, language_code: str, gender: str) -> None:
+        for segment in tts.iter_synthesize(text, language_code=language_code, gender=gender):
+            self.segments.append(segment)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def error(self) -> Optional[BaseException]:
+        return self.future.exception() if self.future.done() else None
+
+    @property
+    def audio(self) -> bytes:
+        """Everything synthesized so far as one MP3."""
+        return b"".join(self.segments)
+
+
 class GoogleTTS:
-    def __init__(self):
+    def __init__(self, max_concurrency: int = TTS_MAX_CONCURRENCY, cache: bool = True, **audio_config):
         setup_google_credentials()
         self.client = texttospeech.TextToSpeechClient()
+        self.max_concurrency = max_concurrency
+        # Extra AudioConfig fields (speaking_rate, pitch, ...); they are part of the cache key.
+        self.audio_config = audio_config
+        self.cache = get_tts_cache() if cache else None
+
+    def _synthesize_chunk(self, text: str, language_code: str, gender: str) -> bytes:
+        if self.cache is None:
+            return self._call_api(text, language_code, gender)
+        return self.cache.get_or_synthesize(
+            text, language_code, gender, dict(self.audio_config, audio_encoding="MP3"),
+            lambda: self._call_api(text, language_code, gender),
+        )
+
+    def _call_api(self, text: str, language_code: str, gender: str) -> bytes:
+        voice_gender = getattr(texttospeech.SsmlVoiceGender, gender.upper(), texttospeech.SsmlVoiceGender.NEUTRAL)
+
+        synthesis_input = texttospeech.SynthesisInput(text=text)
+        voice = texttospeech.VoiceSelectionParams(
+            language_code=language_code,
+            ssml_gender=voice_gender
+        )
+        audio_config = texttospeech.AudioConfig(
+            audio_encoding=texttospeech.AudioEncoding.MP3,
+            **self.audio_config
+        )
+
+        response = self.client.synthesize_speech(
+            input=synthesis_input,
+            voice=voice,
+            audio_config=audio_config
+        )
+        return response.audio_content
+
+    def iter_synthesize(self, text: str, language_code: str = "en-US", gender="NEUTRAL") -> Iterator[bytes]:
+        """
+        Yield MP3 segments in reading order. Chunks are synthesized concurrently
+        (at most max_concurrency in flight), and the first segment is yielded as
+        soon as it is ready so playback can start before the rest is done.
+        """
+        chunks = split_for_tts(text)
+        if not chunks:
+            return
+        if len(chunks) > 1:
+            logger.info(f"Synthesizing {len(chunks)} chunks ({_utf8_len(text)} bytes)")
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(chunks)), thread_name_prefix="tts") as pool:
+            pending, next_chunk = [], 0
+            while pending or next_chunk < len(chunks):
+                while next_chunk < len(chunks) and len(pending) < self.max_concurrency:
+                    pending.append(pool.submit(self._synthesize_chunk, chunks[next_chunk], language_code, gender))
+                    next_chunk += 1
+                yield pending.pop(0).result()
+
+    def start_synthesis(self, text: str, executor: Executor, language_code: str = "en-US", gender="NEUTRAL") -> SynthesisJob:
+        """Run iter_synthesize on `executor`; the returned job exposes segments as they arrive."""
+        return SynthesisJob(self, text, language_code, gender, executor)
 
     def synthesize(self, text: str, language_code: str = "en-US", gender="NEUTRAL") -> bytes:
-        """Convert text to audio using Google Cloud TTS."""
+        """Convert text of any length to audio using Google Cloud TTS."""
         try:
-            voice_gender = getattr(texttospeech.SsmlVoiceGender, gender.upper(), texttospeech.SsmlVoiceGender.NEUTRAL)
-
-            synthesis_input = texttospeech.SynthesisInput(text=text)
-            voice = texttospeech.VoiceSelectionParams(
-                language_code=language_code,
-                ssml_gender=voice_gender
-            )
-            audio_config = texttospeech.AudioConfig(
-                audio_encoding=texttospeech.AudioEncoding.MP3
-            )
-
-            response = self.client.synthesize_speech(
-                input=synthesis_input,
-                voice=voice,
-                audio_config=audio_config
-            )
-
+            # MP3 is a stream of self-contained frames, so segments concatenate into one playable file.
+            audio = b"".join(self.iter_synthesize(text, language_code=language_code, gender=gender))
             logger.info("Audio generated successfully.")
-            return response.audio_content
+            return audio
 
         except Exception as e:
             logger.error(f"TTS synthesis failed: {e}")
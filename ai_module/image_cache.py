@@ -0,0 +1,276 @@
+import io
+import os
+import json
+import threading
+import logging
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from PIL import Image, ImageOps
+
+from ai_module.cache_store import CacheStats, SQLiteStore, cache_path, content_hash
+from ai_module.image_io import ImageSource, read_image_bytes
+from ai_module.response_cache import normalize_prompt
+
+logger = logging.getLogger(__name__)
+
+# 16x16 dHash = 256 bits; page photos of printed text need more bits than the usual 64 to tell pages apart.
+HASH_SIZE = 16
+HASH_BITS = HASH_SIZE * HASH_SIZE
+# 32x32 dHash = 1024 bits, compared only for near matches found with the coarse hash.
+# Pages printed from one template sit close together in the coarse hash; the
+# fine hash still sees the different handwriting on them.
+FINE_HASH_SIZE = 32
+FINE_HASH_BITS = FINE_HASH_SIZE * FINE_HASH_SIZE
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 20000
+# Coarse-hash radius for near-duplicate matches; 0 means exact image bytes only.
+# OCR defaults to exact: a wrong match returns another student's text.
+DEFAULT_THRESHOLDS = {"ocr": 0, "vision": 32}
+# Fine-hash radius a near match must also pass (out of FINE_HASH_BITS).
+VERIFY_THRESHOLDS = {"ocr": 32, "vision": 48}
+DEFAULT_VERIFY_DISTANCE = 32
+
+
+class ImageKey(NamedTuple):
+    digest: str
+    phash: Optional[int] = None
+    fine: Optional[int] = None
+
+
+def _difference_bits(img: Image.Image, hash_size: int) -> int:
+    pixels = img.resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR).tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def dhashes(image: ImageSource, sizes: Tuple[int, ...] = (HASH_SIZE,)) -> List[int]:
+    """
+    Difference hashes at each size: shrink to (size+1) x size greyscale and
+    record whether each pixel is brighter than its right neighbour. Robust to
+    re-compression, small shifts, scaling and lighting changes. The image is
+    decoded once for all sizes.
+    """
+    with Image.open(io.BytesIO(read_image_bytes(image))) as img:
+        # JPEG can decode straight to a reduced size, which skips most of the work on 12-MP photos.
+        img.draft("L", (max(sizes) * 8, max(sizes) * 8))
+        img = ImageOps.exif_transpose(img).convert("L")
+        return [_difference_bits(img, size) for size in sizes]
+
+
+def dhash(image: ImageSource, hash_size: int = HASH_SIZE) -> int:
+    return dhashes(image, (hash_size,))[0]
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes for Hamming-radius queries."""
+
+    def __init__(self):
+        self._root: Optional[Tuple[int, Dict[int, tuple]]] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int) -> None:
+        if self._root is None:
+            self._root = (value, {})
+            self._size = 1
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (value, {})
+                self._size += 1
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, int]]:
+        """Return (distance, hash) pairs within max_distance, nearest first."""
+        if self._root is None:
+            return []
+        found, stack = [], [self._root]
+        while stack:
+            node_value, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= max_distance:
+                found.append((distance, node_value))
+            # Triangle inequality: only subtrees at distance d±max_distance can hold matches.
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return sorted(found)
+
+
+class PerceptualCache:
+    """
+    Result cache keyed by image plus an optional prompt, so a re-uploaded or
+    re-photographed worksheet reuses the earlier OCR / Vision answer.
+
+    Exact matches use the SHA-256 of the image bytes. With max_distance > 0, an
+    image whose coarse dHash is within max_distance bits of a stored one is also
+    a candidate, and is accepted only if its fine dHash is within
+    verify_distance bits as well.
+
+    Results live in SQLite (TTL + LRU eviction); coarse hashes are kept in an
+    in-memory BK-tree. Evicted entries are skipped when a lookup finds them
+    missing, and the tree is rebuilt from disk once every `rebuild_every`
+    evictions rather than on each one.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        path: Optional[str] = None,
+        max_distance: Optional[int] = None,
+        verify_distance: Optional[int] = None,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        rebuild_every: Optional[int] = None,
+    ):
+        self.namespace = namespace
+        self.max_distance = DEFAULT_THRESHOLDS.get(namespace, 0) if max_distance is None else max_distance
+        self.verify_distance = (
+            VERIFY_THRESHOLDS.get(namespace, DEFAULT_VERIFY_DISTANCE) if verify_distance is None else verify_distance
+        )
+        self.store = SQLiteStore(path or cache_path(f"phash_{namespace}.sqlite"), max_entries=max_entries, default_ttl=ttl)
+        self.rebuild_every = rebuild_every or max(64, max_entries // 10)
+        self.stats = CacheStats("near_hits", "near_rejected")
+        self._lock = threading.Lock()
+        self._tree = BKTree()
+        # Coarse hash -> digests of the stored images with that hash.
+        self._digests: Dict[int, Set[str]] = {}
+        self._evictions_seen = 0
+        if self.near_duplicates:
+            self._rebuild()
+
+    @property
+    def near_duplicates(self) -> bool:
+        return self.max_distance > 0
+
+    def _rebuild(self) -> None:
+        tree, digests = BKTree(), {}
+        evictions = self.store.stats.as_dict()["evictions"]
+        for _, _, meta in self.store.scan():
+            phash, _, digest = (meta or "").partition(":")
+            if phash and digest:
+                value = int(phash, 16)
+                tree.add(value)
+                digests.setdefault(value, set()).add(digest)
+        with self._lock:
+            self._tree, self._digests = tree, digests
+            self._evictions_seen = evictions
+
+    def _key(self, digest: str, prompt: str) -> str:
+        return content_hash(self.namespace, digest, normalize_prompt(prompt))
+
+    def image_key(self, image: ImageSource) -> Optional[ImageKey]:
+        """Byte digest plus (with near matching on) perceptual hashes; None if the image cannot be read."""
+        try:
+            data = read_image_bytes(image)
+        except Exception as e:
+            logger.warning(f"Could not read image: {e}")
+            return None
+        key = ImageKey(content_hash(data))
+        if not self.near_duplicates:
+            return key
+        try:
+            phash, fine = dhashes(data, (HASH_SIZE, FINE_HASH_SIZE))
+        except Exception as e:
+            logger.warning(f"Could not hash image: {e}")
+            return key
+        return key._replace(phash=phash, fine=fine)
+
+    def _load(self, digest: str, prompt: str) -> Optional[dict]:
+        value = self.store.get(self._key(digest, prompt))
+        return json.loads(value) if value is not None else None
+
+    def lookup(self, key: Optional[ImageKey], prompt: str = "") -> Optional[dict]:
+        if key is None:
+            return None
+        entry = self._load(key.digest, prompt)
+        if entry is not None:
+            self.stats.incr("hits")
+            return entry["result"]
+        if self.near_duplicates and key.phash is not None:
+            with self._lock:
+                candidates = [
+                    (distance, digest)
+                    for distance, candidate in self._tree.search(key.phash, self.max_distance)
+                    for digest in self._digests.get(candidate, ())
+                ]
+            for distance, digest in candidates:
+                entry = self._load(digest, prompt)
+                if entry is None:
+                    continue
+                fine_distance = hamming(key.fine, int(entry["fine"], 16)) if entry.get("fine") and key.fine is not None else None
+                if fine_distance is None or fine_distance > self.verify_distance:
+                    self.stats.incr("near_rejected")
+                    continue
+                self.stats.incr("hits")
+                self.stats.incr("near_hits")
+                logger.info(
+                    f"{self.namespace} cache: near-duplicate image ({distance}/{HASH_BITS} coarse,"
+                    f" {fine_distance}/{FINE_HASH_BITS} fine bits differ)"
+                )
+                return entry["result"]
+        self.stats.incr("misses")
+        return None
+
+    def store_result(self, key: Optional[ImageKey], prompt: str, result: dict) -> None:
+        if key is None:
+            return
+        entry = {"result": result, "fine": f"{key.fine:x}" if key.fine is not None else None}
+        meta = f"{key.phash:x}:{key.digest}" if key.phash is not None else f":{key.digest}"
+        self.store.set(self._key(key.digest, prompt), json.dumps(entry).encode("utf-8"), meta=meta)
+        self.stats.incr("sets")
+        if key.phash is None:
+            return
+        with self._lock:
+            self._tree.add(key.phash)
+            self._digests.setdefault(key.phash, set()).add(key.digest)
+            # Evicted digests are skipped on lookup; the tree only needs pruning now and then.
+            evictions = self.store.stats.as_dict()["evictions"]
+            stale = evictions - self._evictions_seen >= self.rebuild_every
+            if stale:
+                self._evictions_seen = evictions
+        if stale:
+            self._rebuild()
+
+    def get_or_compute(self, image: ImageSource, prompt: str, compute: Callable[[], dict]) -> dict:
+        key = self.image_key(image)
+        cached = self.lookup(key, prompt)
+        if cached is not None:
+            return cached
+        result = compute()
+        self.store_result(key, prompt, result)
+        return result
+
+
+_shared_caches: Dict[str, PerceptualCache] = {}
+_shared_lock = threading.Lock()
+
+
+def get_image_cache(namespace: str) -> PerceptualCache:
+    """
+    Process-wide PerceptualCache per namespace. SAHAYAK_PHASH_<NAMESPACE> overrides
+    the coarse bit threshold; setting it above 0 turns on near-duplicate matching.
+    """
+    with _shared_lock:
+        if namespace not in _shared_caches:
+            threshold = os.getenv(f"SAHAYAK_PHASH_{namespace.upper()}")
+            _shared_caches[namespace] = PerceptualCache(
+                namespace, max_distance=int(threshold) if threshold else None
+            )
+        return _shared_caches[namespace]
@@ -0,0 +1,34 @@
+import os
+from typing import BinaryIO, Union
+
+# Everything the image services accept: a local path, raw bytes, a memoryview
+# over bytes, or a file-like buffer such as a Streamlit UploadedFile.
+ImageSource = Union[str, bytes, bytearray, memoryview, BinaryIO]
+
+
+def read_image_bytes(image: ImageSource) -> bytes:
+    """
+    Return the encoded image as bytes, copying only when the source is not
+    already backed by a bytes object. In-memory buffers are never written to
+    disk, and nothing is decoded here.
+    """
+    if isinstance(image, bytes):
+        return image
+    if isinstance(image, memoryview):
+        # A full, contiguous view over a bytes object can hand back that object as is.
+        if isinstance(image.obj, bytes) and image.contiguous and image.nbytes == len(image.obj):
+            return image.obj
+        return image.tobytes()
+    if isinstance(image, bytearray):
+        return bytes(image)
+    if isinstance(image, str):
+        if not os.path.exists(image):
+            raise ValueError(f"Image path does not exist: {image}")
+        with open(image, "rb") as f:
+            return f.read()
+    if hasattr(image, "getvalue"):
+        # BytesIO (and UploadedFile) return their internal buffer without a copy.
+        return image.getvalue()
+    if hasattr(image, "read"):
+        return image.read()
+    raise ValueError("Image must be a file path, bytes, memoryview or file-like object.")
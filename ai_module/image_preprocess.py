@@ -0,0 +1,183 @@
+import io
+import os
+import logging
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+from ai_module.cache_store import CacheStats
+from ai_module.image_io import ImageSource, read_image_bytes
+
+logger = logging.getLogger(__name__)
+
+# Formats Gemini and Cloud Vision accept as-is; anything else is always re-encoded.
+SUPPORTED_MIME_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif", "image/bmp"}
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+)
+
+
+def detect_mime_type(data: bytes, default: str = "application/octet-stream") -> str:
+    """Sniff the real image format from its magic bytes instead of trusting the file name."""
+    head = bytes(data[:16])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+        return "image/heic"
+    for signature, mime_type in _SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    return default
+
+
+@dataclass(frozen=True)
+class PreprocessOptions:
+    max_long_edge: int = 1600
+    target_bytes: int = 400_000
+    format: str = "JPEG"  # JPEG or WEBP
+    max_quality: int = 85
+    min_quality: int = 60
+    # 4:2:0 chroma subsampling blurs thin coloured strokes; OCR keeps full chroma.
+    subsampling: int = 2
+
+
+VISION_OPTIONS = PreprocessOptions(
+    max_long_edge=int(os.getenv("SAHAYAK_IMAGE_MAX_EDGE", "1600")),
+)
+# Handwriting and small print need more pixels and milder compression to stay legible.
+OCR_OPTIONS = PreprocessOptions(
+    max_long_edge=int(os.getenv("SAHAYAK_OCR_MAX_EDGE", "2400")),
+    target_bytes=900_000,
+    max_quality=92,
+    min_quality=80,
+    subsampling=0,
+)
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime_type: str
+    original_bytes: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+    transformed: bool = False
+
+    @property
+    def bytes_saved(self) -> int:
+        return max(0, self.original_bytes - len(self.data))
+
+
+stats = CacheStats("images", "transformed", "original_bytes", "sent_bytes")
+
+
+def _encode(image: Image.Image, options: PreprocessOptions, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if options.format.upper() == "WEBP":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    else:
+        try:
+            image.save(buffer, format="JPEG", quality=quality, optimize=True, subsampling=options.subsampling)
+        except OSError:
+            # Huffman optimisation needs the whole output in one buffer, which very noisy images can overflow.
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=quality, subsampling=options.subsampling)
+    return buffer.getvalue()
+
+
+def _encode_to_target(image: Image.Image, options: PreprocessOptions) -> bytes:
+    """Highest quality in [min_quality, max_quality] whose output fits target_bytes."""
+    best = _encode(image, options, options.max_quality)
+    if len(best) <= options.target_bytes:
+        return best
+    low, high = options.min_quality, options.max_quality - 1
+    best = None
+    while low <= high:
+        quality = (low + high) // 2
+        data = _encode(image, options, quality)
+        if len(data) <= options.target_bytes:
+            best, low = data, quality + 1
+        else:
+            high = quality - 1
+    # Never go below min_quality: an over-budget legible image beats a small illegible one.
+    return best if best is not None else _encode(image, options, options.min_quality)
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    if image.mode in ("RGB", "L"):
+        return image
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def preprocess_image(image: ImageSource, options: PreprocessOptions = VISION_OPTIONS) -> PreparedImage:
+    """
+    Downscale to options.max_long_edge and re-encode to fit options.target_bytes.
+    Images that already fit and are in a supported format are returned untouched
+    (only the header is parsed). If re-encoding would not shrink the image, the
+    original bytes are kept.
+    """
+    data = read_image_bytes(image)
+    mime_type = detect_mime_type(data)
+    prepared = PreparedImage(data=data, mime_type=mime_type, original_bytes=len(data))
+    stats.incr("images")
+    stats.incr("original_bytes", len(data))
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            prepared.width, prepared.height = img.size
+            fits = max(img.size) <= options.max_long_edge and len(data) <= options.target_bytes
+            if fits and mime_type in SUPPORTED_MIME_TYPES:
+                stats.incr("sent_bytes", len(data))
+                return prepared
+
+            img = ImageOps.exif_transpose(img)
+            if max(img.size) > options.max_long_edge:
+                img.thumbnail((options.max_long_edge, options.max_long_edge), Image.Resampling.LANCZOS)
+            encoded = _encode_to_target(_flatten(img), options)
+            size = img.size
+    except Exception as e:
+        logger.warning(f"Image preprocessing skipped ({mime_type}): {e}")
+        stats.incr("sent_bytes", len(data))
+        return prepared
+
+    if len(encoded) < len(data) or mime_type not in SUPPORTED_MIME_TYPES:
+        prepared = replace(
+            prepared,
+            data=encoded,
+            mime_type="image/webp" if options.format.upper() == "WEBP" else "image/jpeg",
+            width=size[0],
+            height=size[1],
+            transformed=True,
+        )
+        stats.incr("transformed")
+        logger.info(
+            f"Image {prepared.original_bytes / 1e6:.2f} MB -> {len(encoded) / 1e6:.2f} MB "
+            f"({size[0]}x{size[1]}, saved {prepared.bytes_saved / 1e6:.2f} MB)"
+        )
+    stats.incr("sent_bytes", len(prepared.data))
+    return prepared
+
+
+def report() -> dict:
+    """Images processed in this process and the upload bytes saved."""
+    counts = stats.as_dict()
+    return {
+        "images": counts["images"],
+        "transformed": counts["transformed"],
+        "original_bytes": counts["original_bytes"],
+        "sent_bytes": counts["sent_bytes"],
+        "bytes_saved": counts["original_bytes"] - counts["sent_bytes"],
+    }
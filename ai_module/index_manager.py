@@ -0,0 +1,137 @@
+import threading
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from ai_module.cache_store import content_hash
+from ai_module.embedding_pipeline import BatchedEmbeddings, INGEST_WINDOW, iter_windows
+from ai_module.pdf_extract import iter_pdf_chunks
+from ai_module.retrieval import BM25Index, HybridRetriever
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IndexedFile:
+    name: str
+    file_hash: str
+    chunk_ids: List[str] = field(default_factory=list)
+
+
+@dataclass
+class SyncStatus:
+    running: bool = False
+    current_file: Optional[str] = None
+    chunks_done: int = 0
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+class IncrementalIndex:
+    """
+    A vector store plus BM25 index over a changing set of PDFs. Files are tracked
+    by content hash: sync() only ingests files that are new and deletes the
+    chunks of files that are no longer selected. Chunks are added in windows, so
+    the index answers queries while an ingest is still running.
+    """
+
+    def __init__(self, persist_directory: str, embeddings, vectorstore_cls,
+                 chunk_size: int = 1000, chunk_overlap: int = 200, k: int = 2):
+        self.vectordb = vectorstore_cls(
+            persist_directory=persist_directory,
+            embedding_function=BatchedEmbeddings(embeddings),
+        )
+        self.bm25 = BM25Index()
+        self.retriever = HybridRetriever(self.vectordb, bm25=self.bm25, k=k)
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self.files: Dict[str, IndexedFile] = {}
+        self.status = SyncStatus()
+        self._lock = threading.Lock()
+        # Guards `files` itself; `_lock` is held for a whole sync and would block readers.
+        self._files_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _snapshot(self) -> List[IndexedFile]:
+        with self._files_lock:
+            return [IndexedFile(f.name, f.file_hash, list(f.chunk_ids)) for f in self.files.values()]
+
+    @property
+    def sources(self) -> List[str]:
+        return sorted({f.name for f in self._snapshot()})
+
+    @property
+    def chunk_count(self) -> int:
+        return sum(len(f.chunk_ids) for f in self._snapshot())
+
+    def sync(self, uploads: Sequence[Tuple[str, bytes]]) -> SyncStatus:
+        """Make the index match `uploads` (name, bytes); returns what changed."""
+        with self._lock:
+            self.status = SyncStatus(running=True)
+            try:
+                wanted = {content_hash(data): (name, data) for name, data in uploads}
+                for file_hash in [h for h in self.files if h not in wanted]:
+                    self._remove_file(file_hash)
+                for file_hash, (name, data) in wanted.items():
+                    if file_hash not in self.files:
+                        self._add_file(file_hash, name, data)
+            except Exception as e:
+                logger.error(f"Index sync failed: {e}")
+                self.status.error = str(e)
+            finally:
+                self.status.running = False
+                self.status.current_file = None
+            return self.status
+
+    def sync_in_background(self, uploads: Sequence[Tuple[str, bytes]]) -> bool:
+        """Start sync() on a worker thread; returns False if a sync is already running."""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self.status = SyncStatus(running=True)
+            self._thread = threading.Thread(target=self.sync, args=(list(uploads),), daemon=True)
+            self._thread.start()
+            return True
+
+    def _add_file(self, file_hash: str, name: str, data: bytes) -> None:
+        self.status.current_file = name
+        record = IndexedFile(name=name, file_hash=file_hash)
+        chunks = iter_pdf_chunks(data, self.splitter, source_name=name)
+        try:
+            for window in iter_windows(chunks, INGEST_WINDOW):
+                ids = [f"{file_hash}:{len(record.chunk_ids) + i}" for i in range(len(window))]
+                self.vectordb.add_documents(window, ids=ids)
+                for doc_id, doc in zip(ids, window):
+                    self.bm25.add(doc, doc_id=doc_id)
+                # Register after each window so the chunks are searchable right away.
+                with self._files_lock:
+                    record.chunk_ids.extend(ids)
+                    self.files[file_hash] = record
+                self.status.chunks_done += len(window)
+        except Exception:
+            # Drop the windows already added, so the next sync ingests the whole file again
+            # instead of skipping a half-indexed one.
+            with self._files_lock:
+                self.files.pop(file_hash, None)
+            self._delete_chunks(record)
+            logger.warning(f"Discarded {len(record.chunk_ids)} partial chunks of {name}")
+            raise
+        if record.chunk_ids:
+            self.status.added.append(name)
+            logger.info(f"Indexed {len(record.chunk_ids)} chunks from {name}")
+
+    def _remove_file(self, file_hash: str) -> None:
+        with self._files_lock:
+            record = self.files.pop(file_hash)
+        self._delete_chunks(record)
+        self.status.removed.append(record.name)
+        logger.info(f"Removed {len(record.chunk_ids)} chunks of {record.name}")
+
+    def _delete_chunks(self, record: IndexedFile) -> None:
+        if record.chunk_ids:
+            self.vectordb.delete(ids=record.chunk_ids)
+            for doc_id in record.chunk_ids:
+                self.bm25.remove(doc_id)
@@ -0,0 +1,185 @@
+import json
+import time
+import threading
+import contextvars
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Iterator, List, Optional, Union
+
+from langchain.agents import AgentExecutor
+from langchain.agents.conversational_chat.base import ConversationalChatAgent
+from langchain.agents.conversational_chat.output_parser import ConvoOutputParser
+from langchain.agents.conversational_chat.prompt import FORMAT_INSTRUCTIONS
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import HumanMessage
+from langchain_core.utils.json import parse_json_markdown
+
+logger = logging.getLogger(__name__)
+
+# Braces are quadrupled like in FORMAT_INSTRUCTIONS: the agent str.formats the human
+# message with the tool names, then the result is parsed again as a prompt template.
+PARALLEL_FORMAT_INSTRUCTIONS = FORMAT_INSTRUCTIONS.replace("one of two formats", "one of three formats") + """
+
+**Option #3:**
+Use this if you want the human to use several independent tools at the same time, for example web search and Wikipedia for the same question. Markdown code snippet formatted as a list of Option 1 blobs:
+
+```json
+[
+    {{{{"action": string, "action_input": string}}}},
+    {{{{"action": string, "action_input": string}}}}
+]
+```"""
+
+TIME_UP_MESSAGE = (
+    "Time is up, no more tools can be used. Respond now with a Final Answer based on "
+    "the information gathered so far, using the format of Option #2."
+)
+
+_run_state = threading.local()
+
+
+class ParallelConvoOutputParser(ConvoOutputParser):
+    """ConvoOutputParser that also accepts a JSON list of actions to run concurrently."""
+
+    format_instructions: str = PARALLEL_FORMAT_INSTRUCTIONS
+
+    def parse(self, text: str) -> Union[AgentAction, AgentFinish, List[AgentAction]]:
+        try:
+            response = parse_json_markdown(text)
+        except Exception:
+            response = None
+        if not isinstance(response, list):
+            return super().parse(text)
+
+        actions = []
+        for blob in response:
+            if not isinstance(blob, dict) or "action" not in blob or "action_input" not in blob:
+                raise OutputParserException(f"Could not parse LLM output: {text}")
+            if blob["action"] == "Final Answer":
+                return AgentFinish({"output": blob["action_input"]}, text)
+            # Each action carries only its own blob so the scratchpad reads as one call per step.
+            log = "```json\n" + json.dumps(blob, ensure_ascii=False) + "\n```"
+            actions.append(AgentAction(blob["action"], blob["action_input"], log))
+        if not actions:
+            raise OutputParserException(f"Could not parse LLM output: {text}")
+        return actions[0] if len(actions) == 1 else actions
+
+
+class ParallelConvoChatAgent(ConversationalChatAgent):
+    """ConversationalChatAgent whose "generate" early stop works with its chat-message scratchpad."""
+
+    def return_stopped_response(self, early_stopping_method, intermediate_steps, **kwargs) -> AgentFinish:
+        if early_stopping_method != "generate":
+            return super().return_stopped_response(early_stopping_method, intermediate_steps, **kwargs)
+        # The base implementation builds a string scratchpad, which the chat prompt rejects.
+        thoughts = self._construct_scratchpad(intermediate_steps)
+        thoughts.append(HumanMessage(content=TIME_UP_MESSAGE))
+        full_output = self.llm_chain.predict(agent_scratchpad=thoughts, stop=self._stop, **kwargs)
+        try:
+            parsed = self.output_parser.parse(full_output)
+        except OutputParserException:
+            # Plain prose is still a usable answer.
+            return AgentFinish({"output": full_output}, full_output)
+        if isinstance(parsed, AgentFinish):
+            return parsed
+        # The model asked for another tool anyway; don't show the raw action blob.
+        return super().return_stopped_response("force", intermediate_steps, **kwargs)
+
+
+class ParallelAgentExecutor(AgentExecutor):
+    """
+    AgentExecutor that runs all tool calls from one planning step concurrently.
+
+    Each tool gets `tool_timeout` seconds (overridable per tool name) and the
+    whole run, planning included, shares `time_budget` seconds. A tool that misses
+    its deadline is reported to the agent as timed out, so it can answer from the
+    other results; once the budget is spent no further step is planned and the
+    agent is asked for a final answer from what it has gathered.
+    """
+
+    tool_timeout: float = 20.0
+    tool_timeouts: Dict[str, float] = {}
+    time_budget: float = 60.0
+    early_stopping_method: str = "generate"
+
+    def _should_continue(self, iterations: int, time_elapsed: float) -> bool:
+        if time_elapsed >= self.time_budget:
+            return False
+        return super()._should_continue(iterations, time_elapsed)
+
+    def _call(self, inputs, run_manager=None):
+        _run_state.deadline = time.monotonic() + self.time_budget
+        try:
+            return super()._call(inputs, run_manager=run_manager)
+        finally:
+            _run_state.deadline = None
+
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None) -> Future:
+        # Returns a future instead of an AgentStep; _iter_next_step collects the results.
+        ctx = contextvars.copy_context()
+        perform = super()._perform_agent_action
+        started = threading.Event()
+        timing = {}
+
+        def run():
+            timing["started_at"] = time.monotonic()
+            started.set()
+            return ctx.run(perform, name_to_tool_map, color_mapping, agent_action, run_manager)
+
+        # Each call gets its own short-lived thread instead of a shared pool, so a tool
+        # that overruns its timeout is abandoned without starving other sessions' tools.
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent-tool")
+        future = executor.submit(run)
+        executor.shutdown(wait=False)
+        future.started, future.timing = started, timing
+        return future
+
+    def _iter_next_step(
+        self,
+        name_to_tool_map,
+        color_mapping,
+        inputs,
+        intermediate_steps,
+        run_manager=None,
+    ) -> Iterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        # The parent generator yields every action of the step before it submits any
+        # tool call, so all futures exist before we start waiting on the first one.
+        actions, futures = [], []
+        for output in super()._iter_next_step(
+            name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+        ):
+            if isinstance(output, Future):
+                futures.append(output)
+                continue
+            if isinstance(output, AgentAction):
+                actions.append(output)
+            yield output
+        for action, future in zip(actions, futures):
+            yield self._collect(action, future)
+
+    def _collect(self, action: AgentAction, future: Future) -> AgentStep:
+        timeout = self.tool_timeouts.get(action.tool, self.tool_timeout)
+        deadline: Optional[float] = getattr(_run_state, "deadline", None)
+        # The timeout counts from when the tool starts running, not from when it was submitted.
+        future.started.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        started_at = future.timing.get("started_at", time.monotonic())
+        wait = max(0.0, started_at + timeout - time.monotonic())
+        if deadline is not None:
+            wait = min(wait, max(0.0, deadline - time.monotonic()))
+        try:
+            return future.result(timeout=wait)
+        except FutureTimeoutError:
+            future.cancel()
+            logger.warning(f"Tool {action.tool} timed out after {timeout:.0f}s")
+            if deadline is not None and time.monotonic() >= deadline:
+                observation = (
+                    f"{action.tool} did not finish before the time budget ran out. "
+                    "Answer now with the information gathered so far."
+                )
+            else:
+                observation = (
+                    f"{action.tool} did not respond within {timeout:.0f} seconds. "
+                    "Continue with the other results."
+                )
+            return AgentStep(action=action, observation=observation)
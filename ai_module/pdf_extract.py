@@ -0,0 +1,101 @@
+import os
+import tempfile
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple, Union
+
+import fitz
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Below this many pages a single process is faster than starting a pool.
+PARALLEL_PAGE_THRESHOLD = 80
+PAGES_PER_TASK = 20
+DEFAULT_MAX_WORKERS = max(1, min(4, (os.cpu_count() or 1)))
+
+PdfSource = Union[str, bytes, bytearray]
+
+
+def _read_source(source) -> PdfSource:
+    """Accept a path, raw bytes or a file-like upload; file-likes are read once."""
+    if isinstance(source, (str, bytes, bytearray)):
+        return source
+    if isinstance(source, memoryview):
+        return source.tobytes()
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    return source.read()
+
+
+def _open_pdf(source: PdfSource) -> fitz.Document:
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """Process-pool worker: text of pages [start, stop) of the PDF at `path`."""
+    with fitz.open(path) as doc:
+        return [doc.load_page(i).get_text() for i in range(start, stop)]
+
+
+def _iter_parallel(path: str, page_count: int, max_workers: int) -> Iterator[Tuple[int, str]]:
+    ranges = [(start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK)]
+    window = max_workers * 2
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = []
+        next_range = 0
+        # Keep a bounded number of ranges in flight and yield them in page order.
+        while pending or next_range < len(ranges):
+            while next_range < len(ranges) and len(pending) < window:
+                start, stop = ranges[next_range]
+                pending.append((start, pool.submit(_extract_page_range, path, start, stop)))
+                next_range += 1
+            start, future = pending.pop(0)
+            for offset, text in enumerate(future.result()):
+                yield start + offset + 1, text
+
+
+def iter_pdf_pages(
+    source,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    parallel_threshold: int = PARALLEL_PAGE_THRESHOLD,
+) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) for each page, 1-based and in order. Large PDFs
+    are split into page ranges and extracted on a process pool.
+    """
+    source = _read_source(source)
+    with _open_pdf(source) as doc:
+        page_count = doc.page_count
+        if page_count < parallel_threshold or max_workers <= 1:
+            for i in range(page_count):
+                yield i + 1, doc.load_page(i).get_text()
+            return
+
+    logger.info(f"Extracting {page_count} pages on {max_workers} processes")
+    if isinstance(source, str):
+        yield from _iter_parallel(source, page_count, max_workers)
+        return
+    # Workers open the PDF from disk instead of each receiving a copy of the bytes.
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(source)
+        tmp_path = tmp.name
+    try:
+        yield from _iter_parallel(tmp_path, page_count, max_workers)
+    finally:
+        os.remove(tmp_path)
+
+
+def iter_pdf_documents(source, source_name: Optional[str] = None, **kwargs) -> Iterator[Document]:
+    """Yield one Document per non-empty page with `source` and `page` metadata."""
+    for page_number, text in iter_pdf_pages(source, **kwargs):
+        if text.strip():
+            yield Document(page_content=text, metadata={"source": source_name or "", "page": page_number})
+
+
+def iter_pdf_chunks(source, splitter, source_name: Optional[str] = None, **kwargs) -> Iterator[Document]:
+    """Split page by page, so memory stays flat no matter how long the PDF is."""
+    for page in iter_pdf_documents(source, source_name, **kwargs):
+        yield from splitter.split_documents([page])
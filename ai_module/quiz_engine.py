@@ -0,0 +1,289 @@
+import re
+import json
+import random
+import threading
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set
+
+from pydantic import BaseModel, Field
+
+from ai_module.cache_store import SQLiteStore, cache_path, content_hash
+
+logger = logging.getLogger(__name__)
+
+OPTION_KEYS = ("a", "b", "c", "d")
+DEFAULT_POOL_TARGET = 60
+DEFAULT_BATCH_SIZE = 10
+MAX_POOL_ENTRIES = 50000
+# Earlier questions listed in the prompt so the model writes new ones instead of repeats.
+AVOID_IN_PROMPT = 25
+
+
+# ---------- SCHEMA ----------
+class QuizOptions(BaseModel):
+    a: str = Field(description="Option a")
+    b: str = Field(description="Option b")
+    c: str = Field(description="Option c")
+    d: str = Field(description="Option d")
+
+
+class QuizQuestion(BaseModel):
+    question: str = Field(description="The question text")
+    options: QuizOptions
+    answer: str = Field(description="Letter of the correct option: a, b, c or d")
+
+
+class QuizBatch(BaseModel):
+    questions: List[QuizQuestion]
+
+
+def normalize_question(text: str) -> str:
+    """Dedupe key: case-folded words only, so punctuation and spacing differences collapse."""
+    return " ".join(re.findall(r"\w+", text.casefold()))
+
+
+def validate_question(raw) -> Optional[dict]:
+    """
+    Return the question as {'question', 'options': {a..d}, 'answer'} if it is
+    usable, else None: non-empty text, four distinct non-empty options and an
+    answer letter that names one of them.
+    """
+    if isinstance(raw, BaseModel):
+        raw = raw.model_dump()
+    if not isinstance(raw, dict):
+        return None
+    question = str(raw.get("question") or "").strip()
+    options = raw.get("options") or {}
+    if isinstance(options, list) and len(options) == len(OPTION_KEYS):
+        options = dict(zip(OPTION_KEYS, options))
+    if not question or not isinstance(options, dict):
+        return None
+    options = {key: str(options.get(key) or "").strip() for key in OPTION_KEYS}
+    if not all(options.values()) or len({v.casefold() for v in options.values()}) < len(OPTION_KEYS):
+        return None
+    answer = str(raw.get("answer") or "").strip().lower().rstrip(").")
+    if answer not in OPTION_KEYS:
+        # Some answers come back as the option text instead of its letter.
+        matches = [key for key, value in options.items() if value.casefold() == answer]
+        if len(matches) != 1:
+            return None
+        answer = matches[0]
+    return {"question": question, "options": options, "answer": answer}
+
+
+def parse_questions_text(text: str) -> List[dict]:
+    """Fallback parser for unstructured replies: the outermost JSON array or object anywhere in the text."""
+    for open_char, close_char in (("[", "]"), ("{", "}")):
+        start, end = text.find(open_char), text.rfind(close_char)
+        if start == -1 or end <= start:
+            continue
+        try:
+            data = json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            data = data.get("questions", [])
+        if isinstance(data, list):
+            return data
+    return []
+
+
+# ---------- ENGINE ----------
+class QuizEngine:
+    """
+    Serves quizzes from a per-(subject, grade) question pool. Questions are
+    generated in batches with schema-constrained output, validated, deduped by
+    normalized text and persisted, so a request is usually a random sample from
+    the pool. Each request tops the pool back up in the background.
+
+    Pools are loaded from disk once per key and then kept in memory. At most
+    one fill runs per key; a request that needs more questions joins the
+    running fill instead of generating alongside it.
+    """
+
+    def __init__(
+        self,
+        llm,
+        path: Optional[str] = None,
+        pool_target: int = DEFAULT_POOL_TARGET,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_workers: int = 4,
+    ):
+        self.llm = llm
+        self.structured_llm = llm.with_structured_output(QuizBatch)
+        self.store = SQLiteStore(path or cache_path("quiz_pool.sqlite"), max_entries=MAX_POOL_ENTRIES)
+        self.pool_target = pool_target
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quiz-pool")
+        self._fills: Dict[str, Future] = {}
+        # pool key -> (questions, their dedupe keys); loaded from the store on first use.
+        self._pools: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def pool_key(subject: str, grade: str) -> str:
+        return f"{' '.join(subject.casefold().split())}|{str(grade).strip()}"
+
+    def _loaded(self, key: str) -> tuple:
+        """In-memory (questions, dedupe keys) for a pool; the store is scanned only the first time. Call under _lock."""
+        if key not in self._pools:
+            questions, seen = [], set()
+            for entry_key, value, _ in self.store.scan(meta=key):
+                questions.append(json.loads(value))
+                seen.add(entry_key)
+            self._pools[key] = (questions, seen)
+        return self._pools[key]
+
+    def pool(self, subject: str, grade: str) -> List[dict]:
+        with self._lock:
+            return list(self._loaded(self.pool_key(subject, grade))[0])
+
+    def pool_size(self, subject: str, grade: str) -> int:
+        with self._lock:
+            return len(self._loaded(self.pool_key(subject, grade))[0])
+
+    def _prompt(self, subject: str, grade: str, count: int, avoid: Iterable[str]) -> str:
+        prompt = (
+            f"Create {count} multiple choice questions for grade {grade} on the subject {subject}. "
+            "Each question must have 4 distinct options a, b, c, d and exactly one correct answer, "
+            "given as the option letter. Vary topics and difficulty within the grade level."
+        )
+        avoid = list(avoid)
+        if avoid:
+            prompt += " Do not repeat any of these existing questions:\n" + "\n".join(f"- {q}" for q in avoid)
+        return prompt
+
+    def _generate(self, subject: str, grade: str, count: int, existing: List[dict]) -> List[dict]:
+        avoid = random.sample([q["question"] for q in existing], min(AVOID_IN_PROMPT, len(existing)))
+        prompt = self._prompt(subject, grade, count, avoid)
+        try:
+            batch = self.structured_llm.invoke(prompt)
+            raw = batch.questions if isinstance(batch, QuizBatch) else (batch or {}).get("questions", [])
+        except Exception as e:
+            logger.warning(f"Structured quiz output failed, falling back to text parsing: {e}")
+            raw = parse_questions_text(getattr(self.llm.invoke(prompt), "content", "") or "")
+        questions = [q for q in (validate_question(item) for item in raw) if q]
+        if len(questions) < len(raw):
+            logger.info(f"Dropped {len(raw) - len(questions)} invalid quiz questions")
+        return questions
+
+    def _add(self, subject: str, grade: str, questions: List[dict]) -> int:
+        """Persist new questions; ones whose normalized text is already pooled are skipped."""
+        meta = self.pool_key(subject, grade)
+        items = []
+        with self._lock:
+            pooled, seen = self._loaded(meta)
+            for q in questions:
+                key = content_hash(meta, normalize_question(q["question"]))
+                if key in seen:
+                    continue
+                seen.add(key)
+                pooled.append(q)
+                items.append((key, json.dumps(q).encode("utf-8")))
+        if items:
+            self.store.set_many(items, meta=meta)
+        return len(items)
+
+    def fill(self, subject: str, grade: str, minimum: int, max_rounds: int = 3) -> int:
+        """
+        Generate until the pool holds at least `minimum` questions. Each round
+        requests the shortfall as parallel batches of batch_size (small enough
+        to fit the model's output limit); rounds repeat to replace duplicates
+        and rejected questions.
+        """
+        added = 0
+        for _ in range(max_rounds):
+            existing = self.pool(subject, grade)
+            missing = minimum - len(existing)
+            if missing <= 0:
+                break
+            batches = -(-missing // self.batch_size)
+            with ThreadPoolExecutor(max_workers=min(batches, 4), thread_name_prefix="quiz-batch") as pool:
+                results = list(pool.map(
+                    lambda _: self._generate(subject, grade, self.batch_size, existing), range(batches)
+                ))
+            round_added = sum(self._add(subject, grade, questions) for questions in results)
+            added += round_added
+            if not round_added:
+                break
+        return added
+
+    def _start_fill(self, subject: str, grade: str, minimum: int) -> tuple:
+        """Return (future, started): the running fill for this pool, or a new one if none is running."""
+        key = self.pool_key(subject, grade)
+        with self._lock:
+            future = self._fills.get(key)
+            if future is not None:
+                return future, False
+
+            def run():
+                added = self.fill(subject, grade, minimum)
+                if added:
+                    logger.info(f"Quiz pool {key}: added {added} questions")
+                return added
+
+            future = self._fills[key] = self._executor.submit(run)
+
+        def finished(done: Future):
+            with self._lock:
+                if self._fills.get(key) is done:
+                    del self._fills[key]
+            if done.exception() is not None:
+                logger.warning(f"Quiz pool refill for {key} failed: {done.exception()}")
+
+        future.add_done_callback(finished)
+        return future, True
+
+    def refill_async(self, subject: str, grade: str, minimum: Optional[int] = None) -> bool:
+        """Top the pool up (to pool_target by default) in the background; False if a refill is already running."""
+        return self._start_fill(subject, grade, minimum or self.pool_target)[1]
+
+    def _fill_now(self, subject: str, grade: str, minimum: int, max_attempts: int = 2) -> None:
+        """Wait until the pool holds `minimum` questions, joining a running fill rather than starting a second one."""
+        for _ in range(max_attempts):
+            if self.pool_size(subject, grade) >= minimum:
+                return
+            future, _ = self._start_fill(subject, grade, minimum)
+            try:
+                future.result()
+            except Exception as e:
+                logger.warning(f"Quiz generation failed: {e}")
+                return
+
+    def get_quiz(self, subject: str, grade: str, num_questions: int, exclude: Optional[Set[str]] = None) -> List[dict]:
+        """
+        Sample `num_questions` questions from the pool, preferring ones not in
+        `exclude` (normalized question texts already shown). Generates
+        synchronously only when the pool is too small, then refills in the background.
+        """
+        exclude = exclude or set()
+        pool = self.pool(subject, grade)
+        fresh = [q for q in pool if normalize_question(q["question"]) not in exclude]
+        if len(fresh) < num_questions:
+            self._fill_now(subject, grade, len(pool) + num_questions - len(fresh))
+            pool = self.pool(subject, grade)
+            fresh = [q for q in pool if normalize_question(q["question"]) not in exclude]
+        quiz = random.sample(fresh, min(num_questions, len(fresh)))
+        # Top up with already-seen questions if generation fell short.
+        if len(quiz) < num_questions:
+            seen = [q for q in pool if q not in quiz]
+            quiz += random.sample(seen, min(num_questions - len(quiz), len(seen)))
+        # Sampling does not consume the pool; refill when it is small or this user is running out of unseen questions.
+        if len(pool) < self.pool_target or len(fresh) - len(quiz) < num_questions:
+            self.refill_async(subject, grade, max(self.pool_target, len(pool) + num_questions))
+        return quiz
+
+
+_shared_engine: Optional[QuizEngine] = None
+_shared_lock = threading.Lock()
+
+
+def get_quiz_engine() -> QuizEngine:
+    """Process-wide QuizEngine on the shared chat model."""
+    global _shared_engine
+    with _shared_lock:
+        if _shared_engine is None:
+            from ai_module.agent_registry import get_chat_llm
+            _shared_engine = QuizEngine(get_chat_llm())
+        return _shared_engine
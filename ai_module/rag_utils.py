@@ -1,23 +1,176 @@
-import fitz
+import os
+import shutil
+import threading
+import uuid
+import weakref
+import logging
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.vectorstores import Chroma
 from langchain.prompts import PromptTemplate
 from langchain.chains.question_answering import load_qa_chain
+from ai_module.cache_store import cache_path, content_hash
+from ai_module.embedding_pipeline import ingest_documents
+from ai_module.pdf_extract import iter_pdf_chunks, iter_pdf_pages
+from ai_module.retrieval import HybridRetriever
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+# Bump whenever extraction or chunk metadata changes so older persisted indexes are rebuilt.
+# 2: page-level chunks with page/source metadata (pdf_extract.iter_pdf_chunks).
+# 3: each build lives in its own subdirectory named by the marker file.
+INDEX_VERSION = 3
+# Upper bound for all persisted indexes on disk; least recently used ones go first.
+MAX_INDEX_CACHE_BYTES = 2 * 1024 ** 3
+# Holds the name of the finished build directory inside the index's key directory.
+_INDEX_MARKER = ".complete"
+
+# key -> (build directory, open Chroma store)
+_open_indexes = {}
+_index_locks = {}
+_index_lock = threading.Lock()
+# BM25 indexes are rebuilt from the store once per vectordb, not on every rerun.
+_retrievers = weakref.WeakKeyDictionary()
 
 def extract_text_from_pdf(file):
-    text = ""
-    with fitz.open(stream=file.read(), filetype="pdf") as doc:
-        for page in doc:
-            text += page.get_text()
-    return text
-
-def create_vectorstore(text, embeddings, persist_dir):
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    return "".join(text for _, text in iter_pdf_pages(file))
+
+def create_vectorstore(text, embeddings, persist_dir, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP,
+                       job_id=None, on_progress=None):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
     docs = splitter.create_documents([text])
-    vectordb = Chroma.from_documents(docs, embedding=embeddings, persist_directory=persist_dir)
+    vectordb = ingest_documents(docs, embeddings, persist_dir, Chroma, job_id=job_id, on_progress=on_progress)
+    return vectordb
+
+def create_vectorstore_from_pdf(source, embeddings, persist_dir, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP,
+                                source_name=None, job_id=None, on_progress=None):
+    """Stream page-level chunks straight from the PDF into the index; None if it has no text."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    docs = iter_pdf_chunks(source, splitter, source_name=source_name)
+    return ingest_documents(docs, embeddings, persist_dir, Chroma, job_id=job_id, on_progress=on_progress)
+
+def index_key(data: bytes, embeddings, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP) -> str:
+    """Identify an index by the PDF bytes, the index format version and the splitter and embedding settings."""
+    model = getattr(embeddings, "model", type(embeddings).__name__)
+    return content_hash(data, INDEX_VERSION, "recursive-character", chunk_size, chunk_overlap, model)
+
+
+def get_or_create_vectorstore(file, embeddings, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP,
+                              max_cache_bytes=MAX_INDEX_CACHE_BYTES, on_progress=None):
+    """
+    Return a persistent Chroma index for an uploaded PDF, building it only the
+    first time these bytes are seen with these settings. Returns None when the
+    PDF has no extractable text.
+    """
+    data = file.getvalue() if hasattr(file, "getvalue") else file.read()
+    key = index_key(data, embeddings, chunk_size, chunk_overlap)
+    index_dir = cache_path("rag_indexes", key)
+    marker = os.path.join(index_dir, _INDEX_MARKER)
+
+    with _index_lock:
+        build_lock = _index_locks.setdefault(key, threading.Lock())
+
+    with build_lock:
+        build_dir = _read_marker(marker)
+        if build_dir is not None and key in _open_indexes and _open_indexes[key][0] == build_dir:
+            os.utime(marker)
+            return _open_indexes[key][1]
+
+        if build_dir is not None:
+            logger.info(f"Opening cached RAG index {key[:12]}")
+            vectordb = Chroma(persist_directory=build_dir, embedding_function=embeddings)
+        else:
+            # Every build gets a fresh directory: Chroma keeps one client per path for the
+            # life of the process, so a path must never be deleted and reused while open.
+            build_dir = os.path.join(index_dir, uuid.uuid4().hex)
+            logger.info(f"Building RAG index {key[:12]}")
+            vectordb = create_vectorstore_from_pdf(data, embeddings, build_dir, chunk_size, chunk_overlap,
+                                                   source_name=getattr(file, "name", None),
+                                                   job_id=key, on_progress=on_progress)
+            if vectordb is None:
+                # Nothing was opened for an empty PDF, so its directory is safe to drop.
+                shutil.rmtree(build_dir, ignore_errors=True)
+                return None
+            tmp = f"{marker}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                f.write(os.path.basename(build_dir))
+            os.replace(tmp, marker)
+            _remove_unfinished_builds(index_dir, keep=build_dir)
+        os.utime(marker)
+        _open_indexes[key] = (build_dir, vectordb)
+
+    evict_indexes(max_cache_bytes, keep=key)
     return vectordb
 
-def get_custom_rag_chain(llm, vectordb):
+
+def _read_marker(marker):
+    """Return the finished build directory a marker points at, or None."""
+    try:
+        with open(marker) as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    build_dir = os.path.join(os.path.dirname(marker), name)
+    return build_dir if name and os.path.isdir(build_dir) else None
+
+
+def _remove_unfinished_builds(index_dir, keep):
+    """Drop build directories left behind by interrupted builds; they were never opened."""
+    for name in os.listdir(index_dir):
+        path = os.path.join(index_dir, name)
+        if path != keep and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def evict_indexes(max_bytes=MAX_INDEX_CACHE_BYTES, keep=None):
+    """
+    Delete least recently used persisted indexes until the total size fits in
+    max_bytes. Indexes opened by this process are skipped: Chroma keeps their
+    files open until the process exits.
+    """
+    root = os.path.dirname(cache_path("rag_indexes", "_"))
+    if not os.path.isdir(root):
+        return
+    indexes = []
+    for key in os.listdir(root):
+        path = os.path.join(root, key)
+        marker = os.path.join(path, _INDEX_MARKER)
+        last_used = os.path.getmtime(marker) if os.path.exists(marker) else 0
+        indexes.append((last_used, key, path, _dir_size(path)))
+    total = sum(size for *_, size in indexes)
+    for last_used, key, path, size in sorted(indexes):
+        if total <= max_bytes:
+            break
+        build_lock = _index_locks.get(key)
+        if key == keep or key in _open_indexes or (build_lock is not None and build_lock.locked()):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        logger.info(f"Evicted RAG index {key[:12]} ({size} bytes)")
+
+
+def get_hybrid_retriever(vectordb, k=3):
+    """Shared BM25 + vector retriever for a store, built on first use."""
+    with _index_lock:
+        retriever = _retrievers.get(vectordb)
+        if retriever is None:
+            retriever = _retrievers[vectordb] = HybridRetriever(vectordb, k=k)
+    return retriever
+
+
+def get_custom_rag_chain(llm, vectordb, k=3):
     prompt = PromptTemplate(
         input_variables=["context", "question"],
         template="""
@@ -36,11 +189,11 @@ def get_custom_rag_chain(llm, vectordb):
 
             Answer:"""
                 )
-    retriever = vectordb.as_retriever(search_kwargs={"k": 3})
+    retriever = get_hybrid_retriever(vectordb, k=k)
     qa_chain = load_qa_chain(llm=llm, chain_type="stuff", prompt=prompt)
 
-    def ask(query):
-        docs = retriever.get_relevant_documents(query)
+    def ask(query, sources=None, page_range=None):
+        docs = retriever.retrieve(query, k=k, sources=sources, page_range=page_range)
         return qa_chain.run(input_documents=docs, question=query)
 
     return ask
@@ -0,0 +1,168 @@
+import os
+import re
+import json
+import threading
+import logging
+from typing import Callable, Optional
+
+import numpy as np
+
+from ai_module.cache_store import CacheStats, SQLiteStore, cache_path, content_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_SIMILARITY_THRESHOLD = 0.92
+SEMANTIC_EMBEDDING_MODEL = "models/gemini-embedding-001"
+# Semantic matching is off unless the deployment opts in; exact matches are always safe.
+SEMANTIC_CACHE_ENABLED = os.getenv("SAHAYAK_SEMANTIC_CACHE", "0").lower() in ("1", "true", "yes")
+
+# Words that change the right answer while barely moving the embedding.
+_LANGUAGES = (
+    "english", "hindi", "telugu", "tamil", "kannada", "malayalam", "marathi",
+    "bengali", "gujarati", "punjabi", "odia", "urdu", "sanskrit",
+)
+_DISCRIMINATOR = re.compile(r"\d+(?:\.\d+)?|\b(?:" + "|".join(_LANGUAGES) + r")\b")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case-fold and collapse whitespace so trivially different prompts share a key."""
+    return re.sub(r"\s+", " ", prompt).strip().casefold()
+
+
+def prompt_signature(prompt: str) -> str:
+    """
+    Numbers (grade, class, chapter) and language names in the prompt. Semantic
+    matches are only considered between prompts with the same signature, so
+    "class 5" never answers "class 6" and "in Hindi" never answers "in English".
+    """
+    return " ".join(sorted(set(_DISCRIMINATOR.findall(normalize_prompt(prompt)))))
+
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM responses.
+
+    Tier 1 is an exact match on the normalized prompt plus model parameters.
+    Tier 2 (opt-in per call) compares prompt embeddings against earlier prompts
+    with the same parameters and prompt_signature, and reuses the answer above
+    `similarity_threshold`.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        embeddings=None,
+    ):
+        path = path or cache_path("responses.sqlite")
+        self.responses = SQLiteStore(path, max_entries=max_entries, default_ttl=ttl)
+        self.vectors = SQLiteStore(path.replace(".sqlite", "_vectors.sqlite"), max_entries=max_entries, default_ttl=ttl)
+        self.similarity_threshold = similarity_threshold
+        self.stats = CacheStats("exact_hits", "semantic_hits")
+        self._embeddings = embeddings
+        self._embeddings_lock = threading.Lock()
+
+    @staticmethod
+    def _params_key(params: dict) -> str:
+        return content_hash(json.dumps(params, sort_keys=True, default=str))
+
+    def _key(self, prompt: str, params_key: str) -> str:
+        return content_hash(params_key, normalize_prompt(prompt))
+
+    @staticmethod
+    def _semantic_partition(prompt: str, params_key: str) -> str:
+        return content_hash(params_key, prompt_signature(prompt))
+
+    def _embed(self, prompt: str) -> np.ndarray:
+        with self._embeddings_lock:
+            if self._embeddings is None:
+                from langchain_google_genai import GoogleGenerativeAIEmbeddings
+                self._embeddings = GoogleGenerativeAIEmbeddings(model=SEMANTIC_EMBEDDING_MODEL)
+        vector = np.asarray(self._embeddings.embed_query(normalize_prompt(prompt)), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, prompt: str, params: dict, semantic: bool = False) -> Optional[str]:
+        """Return a cached response, or None on a miss."""
+        params_key = self._params_key(params)
+        value = self.responses.get(self._key(prompt, params_key))
+        if value is not None:
+            self.stats.incr("hits")
+            self.stats.incr("exact_hits")
+            return value.decode("utf-8")
+
+        if semantic:
+            try:
+                match = self._semantic_lookup(prompt, params_key)
+            except Exception as e:
+                logger.warning(f"Semantic cache lookup failed: {e}")
+                match = None
+            if match is not None:
+                self.stats.incr("hits")
+                self.stats.incr("semantic_hits")
+                return match
+
+        self.stats.incr("misses")
+        return None
+
+    def _semantic_lookup(self, prompt: str, params_key: str) -> Optional[str]:
+        candidates = list(self.vectors.scan(meta=self._semantic_partition(prompt, params_key)))
+        if not candidates:
+            # Nothing comparable is indexed; skip the embedding call entirely.
+            return None
+        query = self._embed(prompt)
+        best_key, best_score = None, self.similarity_threshold
+        for key, blob, _ in candidates:
+            candidate = np.frombuffer(blob, dtype=np.float32)
+            if candidate.shape != query.shape:
+                continue
+            score = float(np.dot(query, candidate))
+            if score >= best_score:
+                best_key, best_score = key, score
+        if best_key is None:
+            return None
+        value = self.responses.get(best_key)
+        if value is None:
+            # The response was evicted before its vector; drop the orphan.
+            self.vectors.delete(best_key)
+            return None
+        logger.info(f"Semantic cache hit (similarity {best_score:.3f})")
+        return value.decode("utf-8")
+
+    def store(self, prompt: str, params: dict, response: str, semantic: bool = False) -> None:
+        params_key = self._params_key(params)
+        key = self._key(prompt, params_key)
+        self.responses.set(key, response.encode("utf-8"), meta=params_key)
+        self.stats.incr("sets")
+        if semantic:
+            try:
+                self.vectors.set(key, self._embed(prompt).tobytes(), meta=self._semantic_partition(prompt, params_key))
+            except Exception as e:
+                logger.warning(f"Could not index prompt for semantic cache: {e}")
+
+    def get_or_compute(self, prompt: str, params: dict, compute: Callable[[], str], semantic: bool = False) -> str:
+        """Return the cached response for this prompt, calling `compute` and storing it on a miss."""
+        cached = self.lookup(prompt, params, semantic=semantic)
+        if cached is not None:
+            return cached
+        response = compute()
+        if isinstance(response, str) and response:
+            self.store(prompt, params, response, semantic=semantic)
+        return response
+
+
+_shared_cache: Optional[ResponseCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide ResponseCache; the threshold can be tuned with SAHAYAK_SEMANTIC_THRESHOLD."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            threshold = float(os.getenv("SAHAYAK_SEMANTIC_THRESHOLD", DEFAULT_SIMILARITY_THRESHOLD))
+            _shared_cache = ResponseCache(similarity_threshold=threshold)
+        return _shared_cache
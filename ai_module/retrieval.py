@@ -0,0 +1,223 @@
+import re
+import math
+import threading
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from ai_module.cache_store import content_hash
+
+# Word characters plus the Indic blocks (Devanagari .. Sinhala), whose vowel signs are not \w.
+_TOKEN = re.compile(r"[\w\u0900-\u0DFF]+")
+RRF_K = 60
+# Longest text two neighbouring chunks can share (the splitter's chunk_overlap plus slack).
+MAX_CHUNK_OVERLAP = 250
+MIN_CHUNK_OVERLAP = 30
+
+PageRange = Tuple[int, int]
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.casefold())
+
+
+def chunk_id(doc: Document) -> str:
+    """Stable identity for a chunk: its text plus where it came from."""
+    return content_hash(doc.metadata.get("source", ""), doc.metadata.get("page", ""), doc.page_content)
+
+
+def matches_filter(metadata: dict, sources: Optional[Sequence[str]] = None, page_range: Optional[PageRange] = None) -> bool:
+    if sources and metadata.get("source") not in sources:
+        return False
+    if page_range:
+        page = metadata.get("page")
+        if page is None or not (page_range[0] <= page <= page_range[1]):
+            return False
+    return True
+
+
+def chroma_filter(sources: Optional[Sequence[str]] = None, page_range: Optional[PageRange] = None) -> Optional[dict]:
+    """Translate source/page filters into a Chroma `where` clause."""
+    clauses = []
+    if sources:
+        clauses.append({"source": {"$in": list(sources)}})
+    if page_range:
+        clauses.append({"page": {"$gte": page_range[0]}})
+        clauses.append({"page": {"$lte": page_range[1]}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+# ---------- BM25 ----------
+class BM25Index:
+    """In-memory inverted index with Okapi BM25 scoring. Supports adding and removing chunks."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._doc_len: Dict[str, int] = {}
+        self._docs: Dict[str, Document] = {}
+        self._total_len = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, doc: Document, doc_id: Optional[str] = None) -> str:
+        doc_id = doc_id or chunk_id(doc)
+        terms = Counter(tokenize(doc.page_content))
+        with self._lock:
+            if doc_id in self._docs:
+                return doc_id
+            for term, tf in terms.items():
+                self._postings[term][doc_id] = tf
+            length = sum(terms.values())
+            self._doc_len[doc_id] = length
+            self._total_len += length
+            self._docs[doc_id] = doc
+        return doc_id
+
+    def add_documents(self, docs: Iterable[Document]) -> None:
+        for doc in docs:
+            self.add(doc)
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            doc = self._docs.pop(doc_id, None)
+            if doc is None:
+                return
+            for term in set(tokenize(doc.page_content)):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self._postings[term]
+            self._total_len -= self._doc_len.pop(doc_id, 0)
+
+    def remove_where(self, predicate: Callable[[dict], bool]) -> int:
+        with self._lock:
+            doomed = [doc_id for doc_id, doc in self._docs.items() if predicate(doc.metadata)]
+            for doc_id in doomed:
+                self.remove(doc_id)
+        return len(doomed)
+
+    def search(
+        self,
+        query: str,
+        k: int = 20,
+        sources: Optional[Sequence[str]] = None,
+        page_range: Optional[PageRange] = None,
+    ) -> List[Tuple[Document, float]]:
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._docs)
+            if not n or not terms:
+                return []
+            avgdl = self._total_len / n
+            scores: Dict[str, float] = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avgdl)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / norm
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            results = []
+            for doc_id, score in ranked:
+                doc = self._docs[doc_id]
+                if matches_filter(doc.metadata, sources, page_range):
+                    results.append((doc, score))
+                    if len(results) >= k:
+                        break
+        return results
+
+
+# ---------- HYBRID RETRIEVAL ----------
+def _shared_edge(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    limit = min(len(left), len(right), MAX_CHUNK_OVERLAP)
+    for size in range(limit, MIN_CHUNK_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def dedupe_overlaps(docs: List[Document]) -> List[Document]:
+    """
+    Drop repeated chunks and trim the text neighbouring chunks share because of
+    the splitter's overlap, so the same passage is not sent to the LLM twice.
+    """
+    kept: List[Document] = []
+    seen = set()
+    for doc in docs:
+        text = doc.page_content.strip()
+        if not text or text in seen:
+            continue
+        source = doc.metadata.get("source")
+        for other in kept:
+            if other.metadata.get("source") != source:
+                continue
+            if text in other.page_content:
+                text = ""
+                break
+            shared = _shared_edge(other.page_content, text)
+            if shared:
+                text = text[shared:].strip()
+                continue
+            shared = _shared_edge(text, other.page_content)
+            if shared:
+                text = text[:-shared].strip()
+        if text:
+            seen.add(doc.page_content.strip())
+            kept.append(Document(page_content=text, metadata=dict(doc.metadata)))
+    return kept
+
+
+class HybridRetriever:
+    """
+    Fuses Chroma vector search with a local BM25 index by reciprocal-rank fusion,
+    with optional filtering by source file and page range.
+    """
+
+    def __init__(self, vectordb, bm25: Optional[BM25Index] = None, k: int = 4, fetch_k: int = 20, rrf_k: int = RRF_K):
+        self.vectordb = vectordb
+        self.bm25 = bm25 if bm25 is not None else self.build_bm25(vectordb)
+        self.k = k
+        self.fetch_k = fetch_k
+        self.rrf_k = rrf_k
+
+    @staticmethod
+    def build_bm25(vectordb) -> BM25Index:
+        """Index every chunk already stored in the vector store."""
+        bm25 = BM25Index()
+        stored = vectordb.get(include=["documents", "metadatas"])
+        for text, metadata in zip(stored.get("documents") or [], stored.get("metadatas") or []):
+            if text:
+                bm25.add(Document(page_content=text, metadata=metadata or {}))
+        return bm25
+
+    def retrieve(
+        self,
+        query: str,
+        k: Optional[int] = None,
+        sources: Optional[Sequence[str]] = None,
+        page_range: Optional[PageRange] = None,
+    ) -> List[Document]:
+        k = k or self.k
+        dense = self.vectordb.similarity_search(query, k=self.fetch_k, filter=chroma_filter(sources, page_range))
+        sparse = [doc for doc, _ in self.bm25.search(query, k=self.fetch_k, sources=sources, page_range=page_range)]
+
+        scores: Dict[str, float] = defaultdict(float)
+        docs: Dict[str, Document] = {}
+        for ranking in (dense, sparse):
+            for rank, doc in enumerate(ranking):
+                doc_id = chunk_id(doc)
+                scores[doc_id] += 1.0 / (self.rrf_k + rank + 1)
+                docs.setdefault(doc_id, doc)
+        fused = [docs[doc_id] for doc_id, _ in sorted(scores.items(), key=lambda item: item[1], reverse=True)]
+        return dedupe_overlaps(fused)[:k]
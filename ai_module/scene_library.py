@@ -0,0 +1,171 @@
+import io
+import re
+import time
+import sqlite3
+import threading
+import logging
+from dataclasses import dataclass
+from typing import List, Optional
+
+from PIL import Image
+
+from ai_module.cache_store import SQLiteStore, cache_path, content_hash
+from ai_module.response_cache import normalize_prompt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+THUMBNAIL_SIZE = 256
+
+
+@dataclass
+class Scene:
+    image_hash: str
+    prompt: str
+    aspect_ratio: str
+    created_at: float
+
+
+class SceneLibrary:
+    """
+    Local store of generated images. PNGs and JPEG thumbnails live in a
+    content-addressed blob store (byte quota, LRU eviction); a small index maps
+    each generation request to its images and supports full-text search over
+    prompts, so earlier scenes for a topic can be reused without Imagen.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        path = path or cache_path("scenes.sqlite")
+        self.blobs = SQLiteStore(path.replace(".sqlite", "_images.sqlite"), max_bytes=max_bytes)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS scenes ("
+                " request_key TEXT, image_hash TEXT, prompt TEXT, aspect_ratio TEXT, created_at REAL,"
+                " PRIMARY KEY (request_key, image_hash))"
+            )
+            try:
+                self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS scenes_fts USING fts5(image_hash UNINDEXED, prompt)")
+                self._fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: search falls back to LIKE.
+                self._fts = False
+            self._conn.commit()
+
+    @staticmethod
+    def request_key(prompt: str, negative_prompt: str, model: str, settings: dict) -> str:
+        """Identity of a generation request; the image count is not part of it."""
+        fields = {k: v for k, v in sorted(settings.items()) if k != "number_of_images"}
+        return content_hash(normalize_prompt(prompt), normalize_prompt(negative_prompt), model, repr(fields))
+
+    def _live(self, rows) -> List[tuple]:
+        """Drop index rows whose image was evicted from the blob store."""
+        live, dead = [], []
+        for row in rows:
+            (live if self.blobs.contains(row[0]) else dead).append(row)
+        if dead:
+            with self._lock:
+                self._conn.executemany("DELETE FROM scenes WHERE image_hash = ?", [(row[0],) for row in dead])
+                if self._fts:
+                    self._conn.executemany("DELETE FROM scenes_fts WHERE image_hash = ?", [(row[0],) for row in dead])
+                self._conn.commit()
+        return live
+
+    def lookup(self, request_key: str, limit: int) -> List[bytes]:
+        """PNG bytes of up to `limit` images previously generated for this request."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT image_hash FROM scenes WHERE request_key = ? ORDER BY created_at LIMIT ?",
+                (request_key, limit),
+            ).fetchall()
+        images = []
+        for (image_hash,) in self._live(rows):
+            data = self.blobs.get(image_hash)
+            if data is not None:
+                images.append(data)
+        return images
+
+    def add(self, request_key: str, prompt: str, aspect_ratio: str, png: bytes) -> str:
+        image_hash = content_hash(png)
+        thumbnail = self._thumbnail(png)
+        # Thumbnail first: under LRU it is evicted before the full image it belongs to.
+        if thumbnail:
+            self.blobs.set(f"{image_hash}:thumb", thumbnail)
+        self.blobs.set(image_hash, png)
+        with self._lock:
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO scenes (request_key, image_hash, prompt, aspect_ratio, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (request_key, image_hash, prompt, aspect_ratio, time.time()),
+            ).rowcount
+            if inserted and self._fts:
+                self._conn.execute("INSERT INTO scenes_fts (image_hash, prompt) VALUES (?, ?)", (image_hash, prompt))
+            self._conn.commit()
+        return image_hash
+
+    @staticmethod
+    def _thumbnail(png: bytes) -> Optional[bytes]:
+        try:
+            with Image.open(io.BytesIO(png)) as img:
+                img = img.convert("RGB")
+                img.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+                buffer = io.BytesIO()
+                img.save(buffer, format="JPEG", quality=80)
+                return buffer.getvalue()
+        except Exception as e:
+            logger.warning(f"Could not build thumbnail: {e}")
+            return None
+
+    def search(self, query: str = "", limit: int = 24) -> List[Scene]:
+        """Scenes whose prompt matches every word of `query`, newest first; all scenes if empty."""
+        words = re.findall(r"\w+", query)
+        with self._lock:
+            if not words:
+                rows = self._conn.execute(
+                    "SELECT image_hash, prompt, aspect_ratio, MAX(created_at) FROM scenes"
+                    " GROUP BY image_hash ORDER BY MAX(created_at) DESC LIMIT ?", (limit,)
+                ).fetchall()
+            elif self._fts:
+                match = " ".join(f'"{word}"*' for word in words)
+                rows = self._conn.execute(
+                    "SELECT s.image_hash, s.prompt, s.aspect_ratio, MAX(s.created_at) FROM scenes s"
+                    " JOIN (SELECT DISTINCT image_hash FROM scenes_fts WHERE scenes_fts MATCH ?) f"
+                    " ON f.image_hash = s.image_hash"
+                    " GROUP BY s.image_hash ORDER BY MAX(s.created_at) DESC LIMIT ?", (match, limit)
+                ).fetchall()
+            else:
+                clauses = " AND ".join("prompt LIKE ?" for _ in words)
+                rows = self._conn.execute(
+                    f"SELECT image_hash, prompt, aspect_ratio, MAX(created_at) FROM scenes WHERE {clauses}"
+                    " GROUP BY image_hash ORDER BY MAX(created_at) DESC LIMIT ?",
+                    (*[f"%{word}%" for word in words], limit),
+                ).fetchall()
+        return [Scene(*row) for row in self._live(rows)]
+
+    def image(self, image_hash: str) -> Optional[bytes]:
+        """Full PNG; an explicit request counts as use for LRU eviction."""
+        return self.blobs.get(image_hash)
+
+    def thumbnail(self, image_hash: str) -> Optional[bytes]:
+        """JPEG thumbnail for browsing; does not mark the scene recently used."""
+        return self.blobs.get(f"{image_hash}:thumb", touch=False)
+
+    def report(self) -> dict:
+        with self._lock:
+            scenes = self._conn.execute("SELECT COUNT(DISTINCT image_hash) FROM scenes").fetchone()[0]
+        return {"scenes": scenes, "bytes_stored": self.blobs.total_bytes(), "max_bytes": self.blobs.max_bytes}
+
+
+_shared_library: Optional[SceneLibrary] = None
+_shared_lock = threading.Lock()
+
+
+def get_scene_library() -> SceneLibrary:
+    """Process-wide SceneLibrary."""
+    global _shared_library
+    with _shared_lock:
+        if _shared_library is None:
+            _shared_library = SceneLibrary()
+        return _shared_library
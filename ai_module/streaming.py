@@ -0,0 +1,140 @@
+import json
+import queue
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+_FINAL_ACTION = re.compile(r'"action"\s*:\s*"Final Answer"')
+_ACTION_INPUT = re.compile(r'"action_input"\s*:\s*"')
+_JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+@dataclass
+class ChatEvent:
+    """One streamed event from the agent: an answer token, a tool step or the final answer."""
+    kind: str  # "token", "tool_start", "tool_end" or "final"
+    content: str = ""
+    tool: Optional[str] = None
+
+
+class FinalAnswerExtractor:
+    """
+    Pulls the `action_input` string of a `Final Answer` JSON blob out of an
+    LLM token stream, decoding JSON escapes as it goes.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._streaming = False
+        self._done = False
+        self._pending_escape = ""
+
+    def feed(self, token: str) -> str:
+        """Consume a token and return any newly decoded answer text."""
+        if self._done:
+            return ""
+        if not self._streaming:
+            self._buffer += token
+            action = _FINAL_ACTION.search(self._buffer)
+            if not action:
+                return ""
+            start = _ACTION_INPUT.search(self._buffer, action.end())
+            if not start:
+                return ""
+            self._streaming = True
+            token = self._buffer[start.end():]
+            self._buffer = ""
+        return self._decode(token)
+
+    def _decode(self, text: str) -> str:
+        out = []
+        text = self._pending_escape + text
+        self._pending_escape = ""
+        i = 0
+        while i < len(text):
+            ch = text[i]
+            if ch == "\\":
+                if i + 1 >= len(text):
+                    self._pending_escape = text[i:]
+                    break
+                nxt = text[i + 1]
+                if nxt == "u":
+                    if i + 6 > len(text):
+                        self._pending_escape = text[i:]
+                        break
+                    out.append(chr(int(text[i + 2:i + 6], 16)))
+                    i += 6
+                    continue
+                out.append(_JSON_ESCAPES.get(nxt, nxt))
+                i += 2
+                continue
+            if ch == '"':
+                self._done = True
+                break
+            out.append(ch)
+            i += 1
+        return "".join(out)
+
+
+class AgentStreamHandler(BaseCallbackHandler):
+    """Callback handler that turns an agent run into a queue of ChatEvents."""
+
+    _DONE = object()
+
+    def __init__(self):
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._extractors: Dict[UUID, FinalAnswerExtractor] = {}
+        self._streamed = False
+        self._error: Optional[BaseException] = None
+
+    # Each LLM call gets its own extractor so tool-internal calls cannot leak tokens.
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._extractors[run_id] = FinalAnswerExtractor()
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._extractors[run_id] = FinalAnswerExtractor()
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        extractor = self._extractors.get(run_id)
+        if extractor is None or not isinstance(token, str):
+            return
+        text = extractor.feed(token)
+        if text:
+            self._streamed = True
+            self._queue.put(ChatEvent("token", text))
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        self._extractors.pop(run_id, None)
+
+    def on_agent_action(self, action, **kwargs: Any) -> None:
+        tool_input = action.tool_input
+        if not isinstance(tool_input, str):
+            tool_input = json.dumps(tool_input, ensure_ascii=False)
+        self._queue.put(ChatEvent("tool_start", tool_input, tool=action.tool))
+
+    def on_tool_end(self, output: Any, *, name: Optional[str] = None, **kwargs: Any) -> None:
+        self._queue.put(ChatEvent("tool_end", str(output), tool=name))
+
+    def finish(self, output: str) -> None:
+        """Mark the run as complete; emits the whole answer if nothing was streamed."""
+        if not self._streamed and output:
+            self._queue.put(ChatEvent("token", output))
+        self._queue.put(ChatEvent("final", output))
+        self._queue.put(self._DONE)
+
+    def fail(self, error: BaseException) -> None:
+        self._error = error
+        self._queue.put(self._DONE)
+
+    def events(self) -> Iterator[ChatEvent]:
+        """Yield events until the run finishes; re-raises the agent's exception, if any."""
+        while True:
+            event = self._queue.get()
+            if event is self._DONE:
+                break
+            yield event
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,115 @@
+import threading
+import logging
+from typing import Callable, Dict, Optional
+
+from ai_module.cache_store import CacheStats, LRUCache, SingleFlight, SQLiteStore, cache_path, content_hash
+from ai_module.response_cache import normalize_prompt
+
+logger = logging.getLogger(__name__)
+
+# Web results go stale quickly; encyclopedia pages barely change.
+DEFAULT_TOOL_TTLS: Dict[str, float] = {
+    "Search": 6 * 3600,
+    "DuckDuckGoSearch": 6 * 3600,
+    "Wikipedia": 7 * 24 * 3600,
+}
+DEFAULT_TTL = 24 * 3600
+
+
+class ToolResultCache:
+    """
+    Caches results of lookup tools (web search, Wikipedia, ...) by tool name and
+    normalized query. A bounded in-memory LRU sits in front of a SQLite store,
+    and concurrent identical lookups are coalesced into one outbound call.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        memory_entries: int = 512,
+        max_entries: int = 20000,
+        ttls: Optional[Dict[str, float]] = None,
+    ):
+        self.memory = LRUCache(memory_entries)
+        self.store = SQLiteStore(path or cache_path("tool_results.sqlite"), max_entries=max_entries)
+        self.ttls = dict(DEFAULT_TOOL_TTLS, **(ttls or {}))
+        self._flight = SingleFlight()
+        self._stats: Dict[str, CacheStats] = {}
+        self._stats_lock = threading.Lock()
+
+    def _tool_stats(self, tool_name: str) -> CacheStats:
+        with self._stats_lock:
+            if tool_name not in self._stats:
+                self._stats[tool_name] = CacheStats("memory_hits", "disk_hits", "coalesced", "errors")
+            return self._stats[tool_name]
+
+    def call(self, tool_name: str, query: str, func: Callable[[str], str], ttl: Optional[float] = None) -> str:
+        """Return func(query), served from the cache when a live result exists."""
+        ttl = ttl if ttl is not None else self.ttls.get(tool_name, DEFAULT_TTL)
+        stats = self._tool_stats(tool_name)
+        key = content_hash(tool_name, normalize_prompt(query))
+
+        result = self.memory.get(key)
+        if result is not None:
+            stats.incr("hits")
+            stats.incr("memory_hits")
+            return result
+
+        value = self.store.get(key)
+        if value is not None:
+            result = value.decode("utf-8")
+            self.memory.set(key, result, ttl=ttl)
+            stats.incr("hits")
+            stats.incr("disk_hits")
+            return result
+
+        def fetch() -> str:
+            try:
+                fetched = func(query)
+            except Exception:
+                stats.incr("errors")
+                raise
+            # Errors and empty answers are not cached so the next caller retries.
+            if isinstance(fetched, str) and fetched.strip():
+                self.memory.set(key, fetched, ttl=ttl)
+                self.store.set(key, fetched.encode("utf-8"), meta=tool_name, ttl=ttl)
+                stats.incr("sets")
+            return fetched
+
+        result, shared = self._flight.do(key, fetch)
+        stats.incr("coalesced" if shared else "misses")
+        if shared:
+            stats.incr("hits")
+        return result
+
+    def wrap(self, tool_name: str, func: Callable[[str], str], ttl: Optional[float] = None) -> Callable[[str], str]:
+        """Return a drop-in replacement for `func` that goes through the cache."""
+        def cached(query: str) -> str:
+            return self.call(tool_name, query, func, ttl=ttl)
+        cached.__name__ = getattr(func, "__name__", tool_name)
+        cached.__doc__ = getattr(func, "__doc__", None)
+        return cached
+
+    def stats(self) -> Dict[str, dict]:
+        """Per-tool counters plus the size of both tiers, for monitoring."""
+        with self._stats_lock:
+            report = {name: stats.as_dict() for name, stats in self._stats.items()}
+        report["_store"] = {
+            "memory_entries": len(self.memory),
+            "disk_entries": len(self.store),
+            "disk_bytes": self.store.total_bytes(),
+        }
+        return report
+
+
+_shared_cache: Optional[ToolResultCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_tool_cache() -> ToolResultCache:
+    """Process-wide ToolResultCache shared by the chat agent and the vision web search."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ToolResultCache()
+        return _shared_cache
@@ -0,0 +1,89 @@
+import re
+import json
+import threading
+import logging
+from typing import Callable, Optional
+
+from ai_module.cache_store import CacheStats, SingleFlight, SQLiteStore, cache_path, content_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+
+def normalize_tts_text(text: str) -> str:
+    """Collapse whitespace only; case and punctuation change how text is spoken."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TTSCache:
+    """
+    Content-addressed store for synthesized audio, shared by every session.
+    Entries are keyed by hash(normalized text, language, gender, audio config)
+    and evicted least-recently-used once the store exceeds `max_bytes`.
+    Long texts are cached per chunk, so a story that shares passages with an
+    earlier one only synthesizes the new parts.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.store = SQLiteStore(path or cache_path("tts_audio.sqlite"), max_bytes=max_bytes)
+        self.stats = CacheStats("coalesced")
+        self._flight = SingleFlight()
+
+    @staticmethod
+    def key(text: str, language_code: str, gender: str, audio_config: dict) -> str:
+        return content_hash(
+            normalize_tts_text(text),
+            language_code.lower(),
+            gender.upper(),
+            json.dumps(audio_config, sort_keys=True, default=str),
+        )
+
+    def get_or_synthesize(
+        self,
+        text: str,
+        language_code: str,
+        gender: str,
+        audio_config: dict,
+        synthesize: Callable[[], bytes],
+    ) -> bytes:
+        key = self.key(text, language_code, gender, audio_config)
+        audio = self.store.get(key)
+        if audio is not None:
+            self.stats.incr("hits")
+            return audio
+
+        def fetch() -> bytes:
+            fetched = synthesize()
+            if fetched:
+                self.store.set(key, fetched, meta=language_code)
+                self.stats.incr("sets")
+            return fetched
+
+        # Two classrooms asking for the same passage at once share one synthesis.
+        audio, shared = self._flight.do(key, fetch)
+        self.stats.incr("coalesced" if shared else "misses")
+        return audio
+
+    def report(self) -> dict:
+        stats = self.stats.as_dict()
+        return {
+            "hits": stats["hits"],
+            "misses": stats["misses"],
+            "hit_rate": stats["hit_rate"],
+            "entries": len(self.store),
+            "bytes_stored": self.store.total_bytes(),
+        }
+
+
+_shared_cache: Optional[TTSCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_tts_cache() -> TTSCache:
+    """Process-wide TTSCache."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = TTSCache()
+        return _shared_cache
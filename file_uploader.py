@@ -1,10 +1,8 @@
 import streamlit as st
-from ai_module.pdf_rag import create_rag_db
+from ai_module.embedding_cache import get_embedding_cache
+from ai_module.index_manager import IncrementalIndex
 import os
 import uuid
-import tempfile
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_chroma import Chroma
 
@@ -19,11 +17,8 @@ if 'temp_dir' not in st.session_state:
     os.makedirs(temp_dir, exist_ok=True)
     st.session_state['temp_dir'] = temp_dir
 
-if 'pdf_file' not in st.session_state:
-    st.session_state['pdf_file'] = []
-
-if 'rag_db' not in st.session_state:
-    st.session_state['rag_db'] = None
+if 'index' not in st.session_state:
+    st.session_state['index'] = None
 
 if 'message_history' not in st.session_state:
     st.session_state['message_history'] = []
@@ -38,45 +33,61 @@ def create_user_folder():
         st.success(f"User folder created: {user_folder}")
     return state.user_folder
 
-def process_pdf_files(uploaded_files):
-    all_chunks = []
-    file_names = []
-    for file in uploaded_files:
-        with tempfile.NamedTemporaryFile(delete=False, dir=state.temp_dir) as temp_file:
-            temp_file.write(file.getvalue())
-            temp_file_path = temp_file.name
-
-        loader = PyPDFLoader(temp_file_path)
-        documents = loader.load()
-        for doc in documents:
-            doc.metadata['source'] = file.name
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        docs = text_splitter.split_documents(documents)
-        all_chunks.extend(docs)
-        file_names.append(file.name)
-        os.remove(temp_file_path)
-
-    if all_chunks:
+def get_index():
+    # One incremental index per session: files are added and removed in place instead of rebuilt per click.
+    if state.index is None:
         embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-        vectordb = Chroma.from_documents(
-            documents=all_chunks,
-            embedding=embeddings,
-            persist_directory=state.temp_dir
-        )
-        state.rag_db = vectordb
-        st.success(f"Processed {len(all_chunks)} chunks from {len(uploaded_files)} files: {', '.join(file_names)}")
-        return list(set(file_names))
-    return []
+        state.index = IncrementalIndex(state.temp_dir, embeddings, Chroma, k=2)
+    return state.index
+
+def show_index_status():
+    index = state.index
+    if index is None:
+        return
+    # Poll only while a sync is running; once it finishes the whole page reruns without polling.
+    polling = index.status.running
+
+    @st.fragment(run_every=2 if polling else None)
+    def index_status():
+        status = index.status
+        if status.running:
+            current = f" ({status.current_file})" if status.current_file else ""
+            st.caption(f"Indexing{current}: {status.chunks_done} chunks embedded. Queries use the files indexed so far.")
+            return
+        if polling:
+            st.rerun()
+        if status.error:
+            st.error(f"Indexing failed: {status.error}")
+        else:
+            changes = []
+            if status.added:
+                changes.append(f"added {', '.join(status.added)}")
+            if status.removed:
+                changes.append(f"removed {', '.join(status.removed)}")
+            summary = "; ".join(changes) or "no changes"
+            st.caption(f"{index.chunk_count} chunks from {len(index.sources)} files ({summary})")
+            report = get_embedding_cache().report()
+            st.caption(f"Embedding cache: {report['hit_rate']:.0%} hit rate, {report['bytes_stored'] / 1e6:.1f} MB stored")
+
+    index_status()
 
 files = st.file_uploader("Upload PDF files", type=["pdf"], accept_multiple_files=True)
-if files and st.button("Process PDFs"):
-    with st.spinner("Processing PDFs..."):
-        state.pdf_file = process_pdf_files(files)
-        st.success("PDF files processed successfully.")
+if st.button("Process PDFs", disabled=not files and state.index is None):
+    index = get_index()
+    if not index.sync_in_background([(file.name, file.getvalue()) for file in files or []]):
+        st.warning("Indexing is still running; try again when it finishes.")
+
+show_index_status()
 
-if state.rag_db:
+if state.index is not None and (state.index.chunk_count or state.index.status.running):
     st.subheader("Query the RAG Database")
 
+    filter_cols = st.columns([0.6, 0.2, 0.2])
+    selected_sources = filter_cols[0].multiselect("Search in files", state.index.sources, help="Leave empty to search all files")
+    first_page = filter_cols[1].number_input("From page", min_value=0, value=0)
+    last_page = filter_cols[2].number_input("To page", min_value=0, value=0)
+    page_range = (int(first_page), int(last_page)) if first_page and last_page >= first_page else None
+
     for message in state.message_history:
         with st.chat_message(message['role']):
             st.markdown(message['content'])
@@ -86,11 +97,17 @@ if state.rag_db:
 
         with st.chat_message("assistant"):
             with st.spinner("Retrieving information..."):
-                retriever = state.rag_db.as_retriever(search_kwargs={"k": 2})
-                retrieved_docs = retriever.invoke(user_query)
+                retrieved_docs = state.index.retriever.retrieve(
+                    user_query,
+                    sources=selected_sources or None,
+                    page_range=page_range,
+                )
 
                 if retrieved_docs:
-                    response = retrieved_docs[0].page_content
+                    response = "\n\n".join(
+                        f"**{doc.metadata.get('source', '')}, page {doc.metadata.get('page', '?')}**\n\n{doc.page_content}"
+                        for doc in retrieved_docs
+                    )
                     st.markdown(response)
                     state.message_history.append({"role": "assistant", "content": response})
                 else:
@@ -1,8 +1,14 @@
 # game_generator.py
 import getpass
 import os
+import re
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 from langchain.chat_models import init_chat_model
+from gamemodule.game_store import GameStore
+
+# Bump whenever the prompt in generate_game_code changes, so stored games from the old prompt are not served.
+PROMPT_VERSION = "1"
 
 def remove_code_fences(text):
     lines = text.splitlines()
@@ -19,6 +25,58 @@ def remove_code_fences(text):
 
     return "\n".join(cleaned_lines)
 
+# The line boundaries str.splitlines() recognises, so FenceStripper splits exactly like remove_code_fences.
+_LINE_BREAK = re.compile(r"\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+
+class FenceStripper:
+    """Incremental remove_code_fences: feed chunks as they stream in and get cleaned text back."""
+
+    def __init__(self):
+        self.inside_code_block = False
+        self.pending = ""
+        self.started = False
+
+    def _line(self, line):
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            self.inside_code_block = not self.inside_code_block
+            return ""
+        if self.inside_code_block or stripped:
+            text = line if not self.started else "\n" + line
+            self.started = True
+            return text
+        return ""
+
+    def feed(self, chunk):
+        self.pending += chunk
+        # A trailing \r may be the first half of a \r\n split across chunks; hold it back.
+        held = "\r" if self.pending.endswith("\r") else ""
+        *lines, rest = _LINE_BREAK.split(self.pending[:len(self.pending) - len(held)])
+        self.pending = rest + held
+        return "".join(self._line(line) for line in lines)
+
+    def finish(self):
+        lines, self.pending = self.pending.splitlines(), ""
+        return "".join(self._line(line) for line in lines)
+
+# Structural markers reported as milestones while a game streams in, in the order they usually appear.
+MILESTONES = ("<html", "<canvas", "<script", "</script>", "</html>")
+MAX_GAME_BYTES = 200_000
+# Without a doctype/html tag this early, the model is writing prose instead of a page.
+HTML_START_WITHIN = 400
+# A game page that has neither a canvas nor a script this far in is not going to be playable.
+STRUCTURE_WITHIN = 30_000
+# Text after </html> is commentary; stop reading once this much of it has arrived.
+TRAILING_ALLOWANCE = 200
+
+@dataclass
+class GameProgress:
+    bytes_received: int = 0
+    milestones: list = field(default_factory=list)
+    code: str = None
+    error: str = None
+    done: bool = False
+
 load_dotenv('.env')
 
 if not os.environ.get("GOOGLE_API_KEY"):
@@ -29,8 +87,11 @@ try:
 except Exception as e:
     print(f"Failed to initialize the chat model: {e}")
     exit()
-def  generate_game_code(context):
-    prompt = f"""
+
+game_store = GameStore(PROMPT_VERSION)
+
+def build_prompt(context):
+    return f"""
 You are a JavaScript game developer creating simple 2D educational games for children using **HTML5 Canvas** and **vanilla JavaScript** (no external libraries like Phaser.js or p5.js).
 
 Generate a complete **HTML file** with embedded JavaScript that teaches the topic: **"{context}"** in a fun, interactive, and age-appropriate way for a 5th-grade student (around 10–11 years old).
@@ -47,6 +108,9 @@ Example Topics: Waste Management (separating items), Nutrition (classifying food
 
 Generate only the HTML code as plain text — no explanations.
 """
+
+def  generate_game_code(context):
+    prompt = build_prompt(context)
     try:
         s = model.invoke(prompt)
         return remove_code_fences(s.content)
@@ -54,3 +118,73 @@ Generate only the HTML code as plain text — no explanations.
         print(f"An error occurred while invoking the model: {e}")
         return None
 
+def pregenerate_games(topics=None):
+    """Fill the store in the background; topics default to the comma-separated SAHAYAK_GAME_TOPICS."""
+    if topics is None:
+        topics = [t.strip() for t in os.getenv("SAHAYAK_GAME_TOPICS", "").split(",") if t.strip()]
+    if topics:
+        game_store.pregenerate(topics, generate_game_code)
+
+def _check(code, progress):
+    """Return an error message once the streamed output is clearly not a usable game."""
+    lower = code.lower()
+    if len(code) >= HTML_START_WITHIN and "<html" not in lower and "<!doctype" not in lower:
+        return "The model did not start an HTML document."
+    if len(code) >= STRUCTURE_WITHIN and "<canvas" not in progress.milestones and "<script" not in progress.milestones:
+        return "No <canvas> or <script> found; the output is not a playable game."
+    if len(code.encode("utf-8")) > MAX_GAME_BYTES:
+        return "The output grew past the size limit."
+    return None
+
+def stream_game_code(context):
+    """
+    Stream a game from the model, yielding GameProgress after each chunk: bytes
+    received and structural milestones reached. Fences are stripped as the text
+    arrives. Generation is abandoned as soon as the output is clearly malformed
+    (the last update then carries `error`); the final update carries `code`.
+    """
+    progress = GameProgress()
+    stripper = FenceStripper()
+    parts = []
+    html_closed_at = None
+    try:
+        for chunk in model.stream(build_prompt(context)):
+            text = chunk.content if isinstance(chunk.content, str) else "".join(
+                part.get("text", "") if isinstance(part, dict) else str(part) for part in chunk.content
+            )
+            progress.bytes_received += len(text.encode("utf-8"))
+            parts.append(stripper.feed(text))
+            # Include the unterminated last line so checks do not wait for a newline.
+            code = "".join(parts) + stripper.pending
+            lower = code.lower()
+            for marker in MILESTONES:
+                if marker not in progress.milestones and marker in lower:
+                    progress.milestones.append(marker)
+                    if marker == "</html>":
+                        html_closed_at = progress.bytes_received
+            progress.error = _check(code, progress)
+            if progress.error:
+                progress.done = True
+                yield progress
+                return
+            if html_closed_at is not None and progress.bytes_received - html_closed_at > TRAILING_ALLOWANCE:
+                break
+            yield progress
+        parts.append(stripper.finish())
+    except Exception as e:
+        print(f"An error occurred while streaming from the model: {e}")
+        progress.error = str(e)
+        progress.done = True
+        yield progress
+        return
+
+    code = "".join(parts)
+    end = code.lower().rfind("</html>")
+    if end != -1:
+        code = code[:end + len("</html>")]
+    progress.done = True
+    if "</html>" not in progress.milestones:
+        progress.error = "The game was cut off before </html>."
+    else:
+        progress.code = code
+    yield progress
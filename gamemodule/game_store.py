@@ -0,0 +1,121 @@
+# game_store.py
+import os
+import re
+import glob
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+from ai_module.cache_store import SQLiteStore, cache_path, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Folders where the page has saved games; their files are served as-is.
+GAME_FOLDERS = ("web_game", os.path.join("gamemodule", "web_game"))
+
+# Saved games are named f"{context}_game.html" by the game page.
+GAME_FILE_SUFFIX = "_game.html"
+
+# "on/about/for" is filler only after "game": "for loops" is a topic in itself.
+_FILLER_PREFIX = re.compile(r"^(?:(?:generate|create|make|build)\s+)?(?:an?\s+)?game\s+(?:on|about|for)\s+")
+_FILLER_SUFFIX = re.compile(r"\s+game$")
+
+
+def normalize_context(context: str) -> str:
+    """'Generate a game on Waste-Management ' and 'waste management' share one key."""
+    text = re.sub(r"[_\W]+", " ", context.casefold()).strip()
+    text = _FILLER_PREFIX.sub("", text)
+    return _FILLER_SUFFIX.sub("", text).strip()
+
+
+def looks_like_game(html: Optional[str]) -> bool:
+    """Only complete-looking HTML pages are stored, so a bad generation is retried next time."""
+    if not html:
+        return False
+    lower = html.lower()
+    return ("<html" in lower or "<!doctype html" in lower) and ("<canvas" in lower or "<script" in lower)
+
+
+class GameStore:
+    """
+    Generated games keyed by normalized context plus prompt version. Games from
+    the current prompt live in SQLite; games already saved under web_game/ are
+    indexed by file name and served as a fallback.
+    """
+
+    def __init__(self, prompt_version: str, path: Optional[str] = None, folders: Iterable[str] = GAME_FOLDERS):
+        self.prompt_version = prompt_version
+        self.store = SQLiteStore(path or cache_path("games.sqlite"))
+        self.files: Dict[str, str] = {}
+        self._pregenerating = set()
+        self._lock = threading.Lock()
+        self.index_folders(folders)
+
+    def index_folders(self, folders: Iterable[str]) -> int:
+        """Index saved *_game.html files by the context encoded in their names."""
+        count = 0
+        for folder in folders:
+            for path in sorted(glob.glob(os.path.join(folder, f"*{GAME_FILE_SUFFIX}"))):
+                name = os.path.basename(path)[:-len(GAME_FILE_SUFFIX)]
+                context = normalize_context(name.replace("_", " "))
+                if context:
+                    self.files.setdefault(context, path)
+                    count += 1
+        if count:
+            logger.info(f"Indexed {count} saved games")
+        return count
+
+    def _key(self, context: str) -> str:
+        return content_hash(self.prompt_version, normalize_context(context))
+
+    def get(self, context: str) -> Optional[str]:
+        html = self.store.get(self._key(context))
+        if html is not None:
+            return html.decode("utf-8")
+        path = self.files.get(normalize_context(context))
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+        return None
+
+    def put(self, context: str, html: str) -> bool:
+        if not looks_like_game(html):
+            return False
+        self.store.set(self._key(context), html.encode("utf-8"), meta=normalize_context(context))
+        return True
+
+    def get_or_generate(self, context: str, generate: Callable[[str], Optional[str]]) -> Optional[str]:
+        html = self.get(context)
+        if html is not None:
+            return html
+        html = generate(context)
+        self.put(context, html)
+        return html
+
+    def pregenerate(self, topics: Iterable[str], generate: Callable[[str], Optional[str]], max_workers: int = 2) -> None:
+        """Generate games for `topics` that are not stored yet, on background threads."""
+        todo = []
+        with self._lock:
+            for topic in topics:
+                key = normalize_context(topic)
+                if key and key not in self._pregenerating and self.get(topic) is None:
+                    self._pregenerating.add(key)
+                    todo.append(topic)
+        if not todo:
+            return
+        logger.info(f"Pre-generating {len(todo)} games: {', '.join(todo)}")
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="game-pregen")
+
+        def run(topic: str) -> None:
+            try:
+                self.get_or_generate(topic, generate)
+            except Exception as e:
+                logger.warning(f"Pre-generating '{topic}' failed: {e}")
+            finally:
+                with self._lock:
+                    self._pregenerating.discard(normalize_context(topic))
+
+        for topic in todo:
+            pool.submit(run, topic)
+        pool.shutdown(wait=False)
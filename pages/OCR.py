@@ -1,9 +1,8 @@
 import streamlit as st
 import os
-import tempfile
-from PIL import Image
-import io
+import hashlib
 from ai_module.gcloud_services import GoogleOCR, GoogleTTS  # <-- Replace with your actual import path
+from synthesis_ui import show_synthesis_job, synthesis_pool
 
 # Streamlit page configuration
 st.set_page_config(
@@ -21,87 +20,135 @@ st.title("📷 Akshara")
 st.subheader("OCR Text Extractor")
 st.markdown("Upload an image or take a picture to extract text using Google Cloud Vision API and convert to audio using TTS.")
 
+if "ocr_results" not in st.session_state:
+    st.session_state["ocr_results"] = {}
+if "tts_jobs" not in st.session_state:
+    st.session_state["tts_jobs"] = {}
+state = st.session_state
+
+
+def show_result(name: str, result: dict, key: str):
+    """Render one OCR result with download, read-aloud and stats; `key` must be unique per upload."""
+    if result.get("error"):
+        st.error(f"❌ {name}: {result['error']}")
+        return
+    extracted_text = result.get("text", "")
+    if not extracted_text:
+        st.warning(f"⚠️ No text detected in {name}.")
+        return
+
+    detected_lang = result.get("locale") or "en-US"
+    st.caption(f"Detected Language: `{detected_lang}`" + (" · ⚡ matched an earlier scan" if result.get("cached") else ""))
+    st.text_area(
+        label="Extracted Text",
+        value=extracted_text,
+        height=300,
+        help="You can copy or download this text",
+        key=f"text_{key}"
+    )
+
+    # Download + Audio options
+    col_dl, col_audio = st.columns([1, 1])
+    with col_dl:
+        st.download_button(
+            label="📥 Download Text",
+            data=extracted_text.encode('utf-8'),
+            file_name=f"{os.path.splitext(name)[0]}.txt",
+            mime="text/plain",
+            key=f"dl_{key}"
+        )
+
+    with col_audio:
+        if st.button("🔊 Read Aloud", key=f"tts_{key}"):
+            state.tts_jobs[key] = tts.start_synthesis(extracted_text, synthesis_pool(), language_code=detected_lang)
+        if key in state.tts_jobs:
+            show_synthesis_job(state.tts_jobs[key])
+
+    # Stats
+    st.metric("📄 Words", len(extracted_text.split()))
+    st.metric("🔠 Characters", len(extracted_text))
+
+
 # UI: Image input section
 col1, col2 = st.columns([1, 1])
 
 with col1:
     use_camera = st.toggle("📸 Use Camera")
     if use_camera:
-        uploaded_file = st.camera_input("Take a picture of text")
+        captured = st.camera_input("Take a picture of text")
+        uploaded_files = [captured] if captured else []
     else:
-        st.subheader("📤 Upload an Image")
-        uploaded_file = st.file_uploader(
-            "Choose an image file",
+        st.subheader("📤 Upload Images")
+        uploaded_files = st.file_uploader(
+            "Choose image files",
             type=['png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'],
-            help="Upload an image containing text to extract"
-        )
+            accept_multiple_files=True,
+            help="Upload one or more images containing text, e.g. a stack of answer sheets"
+        ) or []
 
-    if uploaded_file:
-        # Display the uploaded image
+    if uploaded_files:
         st.subheader("📷 Preview")
-        image = Image.open(uploaded_file)
-        st.image(image, caption="Uploaded Image", use_container_width=True)
+        if len(uploaded_files) == 1:
+            st.image(uploaded_files[0].getvalue(), caption="Uploaded Image", use_container_width=True)
+        else:
+            st.image([f.getvalue() for f in uploaded_files], caption=[f.name for f in uploaded_files], width=120)
 
         # File info
-        file_size_mb = uploaded_file.size / (1024 * 1024)
-        st.info(f"File size: {file_size_mb:.2f} MB")
+        total_mb = sum(f.size for f in uploaded_files) / (1024 * 1024)
+        st.info(f"{len(uploaded_files)} image(s), {total_mb:.2f} MB")
 
 with col2:
     st.subheader("📝 OCR Results")
 
-    if uploaded_file:
-        with st.spinner("🔍 Extracting text using Google Vision..."):
-            try:
-                # Save uploaded image temporarily
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-                    tmp_file.write(uploaded_file.getvalue())
-                    temp_image_path = tmp_file.name
-
-                result = ocr.extract_text(temp_image_path)
-                extracted_text = result.get("text", "")
-                annotations = result.get("raw_response").text_annotations
-                os.remove(temp_image_path)
-
-                if extracted_text:
-                    detected_lang = annotations[0].locale if annotations else "en-US"
-                    st.success("✅ Text extracted successfully!")
-                    st.caption(f"Detected Language: `{detected_lang}`")
-
-                    # Display extracted text
-                    st.text_area(
-                        label="Extracted Text",
-                        value=extracted_text,
-                        height=300,
-                        help="You can copy or download this text"
-                    )
-
-                    # Download + Audio options
-                    text_bytes = extracted_text.encode('utf-8')
-                    col_dl, col_audio = st.columns([1, 1])
-                    with col_dl:
-                        st.download_button(
-                            label="📥 Download Text",
-                            data=text_bytes,
-                            file_name="extracted_text.txt",
-                            mime="text/plain"
-                        )
-
-                    with col_audio:
-                        if st.button("🔊 Read Aloud"):
-                            try:
-                                audio_data = tts.synthesize(extracted_text, language_code=detected_lang)
-                                st.audio(audio_data, format="audio/mp3")
-                            except Exception as e:
-                                st.error(f"❌ TTS Error: {str(e)}")
-
-                    # Stats
-                    st.metric("📄 Words", len(extracted_text.split()))
-                    st.metric("🔠 Characters", len(extracted_text))
-
-                else:
-                    st.warning("⚠️ No text detected in the image.")
-            except Exception as e:
-                st.error(f"❌ Error: {str(e)}")
-                st.info("Ensure your Google Cloud credentials are configured.")
+    if uploaded_files:
+        contents = [f.getvalue() for f in uploaded_files]
+        keys = [hashlib.sha256(c).hexdigest()[:16] for c in contents]
+        # Widgets are keyed by position too, since the same image can be uploaded twice.
+        widget_keys = [f"{i}_{key}" for i, key in enumerate(keys)]
+        # Only images without a successful result go to Vision, once per distinct image;
+        # reruns (e.g. Read Aloud) reuse results and retry the ones that failed.
+        pending = [
+            key for key in dict.fromkeys(keys)
+            if key not in state.ocr_results or state.ocr_results[key].get("error")
+        ]
+
+        if len(uploaded_files) == 1:
+            if pending:
+                with st.spinner("🔍 Extracting text using Google Vision..."):
+                    state.ocr_results[keys[0]] = ocr.extract_texts(contents)[0]
+            show_result(uploaded_files[0].name, state.ocr_results[keys[0]], widget_keys[0])
+            saved = state.ocr_results[keys[0]].get("bytes_saved", 0)
+            if saved:
+                st.caption(f"Upload compressed before sending: {saved / (1024 * 1024):.2f} MB saved")
+        else:
+            slots = {}
+            for i, file in enumerate(uploaded_files):
+                slots[i] = st.expander(f"{i + 1}. {file.name}", expanded=False)
+                if keys[i] in state.ocr_results and keys[i] not in pending:
+                    with slots[i]:
+                        show_result(file.name, state.ocr_results[keys[i]], widget_keys[i])
+
+            if pending:
+                progress = st.progress(0.0, text=f"🔍 Extracting text from {len(pending)} images...")
+                done = 0
+                try:
+                    for j, result in ocr.iter_extract_texts([contents[keys.index(key)] for key in pending]):
+                        state.ocr_results[pending[j]] = result
+                        for i in (i for i, key in enumerate(keys) if key == pending[j]):
+                            with slots[i]:
+                                show_result(uploaded_files[i].name, result, widget_keys[i])
+                        done += 1
+                        progress.progress(done / len(pending), text=f"🔍 {done}/{len(pending)} images done")
+                except Exception as e:
+                    st.error(f"❌ Error: {str(e)}")
+                    st.info("Ensure your Google Cloud credentials are configured.")
+
+            saved = sum(state.ocr_results.get(key, {}).get("bytes_saved", 0) for key in keys)
+            if saved:
+                st.caption(f"Uploads compressed before sending: {saved / (1024 * 1024):.2f} MB saved")
+
+            failed = sum(1 for key in keys if state.ocr_results.get(key, {}).get("error"))
+            if failed:
+                st.warning(f"⚠️ {failed} of {len(keys)} images could not be read.")
     else:
-        st.info("👆 Upload or capture an image to get started.")
+        st.info("👆 Upload or capture images to get started.")
@@ -1,10 +1,10 @@
 import streamlit as st
 from streamlit_mic_recorder import speech_to_text
-from ai_module.ai_models import TeacherChatAgent
+from ai_module.agent_registry import get_chat_llm
 
 
 # --- Initialize LLM (reuse your earlier setup) ---
-llm = TeacherChatAgent().llm
+llm = get_chat_llm()
 
 # --- Reference prompt (speech to memorize/read) ---
 REFERENCE_SPEECH = """
@@ -1,31 +1,19 @@
+import time
 import streamlit as st
-from ai_module.ai_models import TeacherChatAgent
-import re
-import json
+from ai_module.quiz_engine import get_quiz_engine, normalize_question
 
-llm = TeacherChatAgent().llm
-def generate_quiz(subject: str, grade: str, num_questions: int):
-    prompt = (
-        f"Create a multiple choice quiz with {num_questions} questions for grade {grade} on the subject {subject}. "
-        "Each question should have 4 options labeled a, b, c, d, and one correct answer. "
-        "Format the output as a JSON array of questions with fields: 'question', 'options' (a dict), and 'answer' (the correct option letter)."
-    )
-    
-    response = llm.invoke(input=prompt)
-    response = response.to_json()
+engine = get_quiz_engine()
 
-    json_match = re.search(r"```json\s*(\[\s*[\s\S]*\s*\])\s*```", response['kwargs']['content'])
-    if not json_match:
-        st.error("Could not find JSON data in the response.")
-        return []
-    
-    json_str = json_match.group(1)
+def generate_quiz(subject: str, grade: str, num_questions: int):
+    """Samples from the shared question pool, avoiding questions this session has already seen."""
+    seen = st.session_state.setdefault('seen_questions', set())
     try:
-        quiz_data = json.loads(json_str)
-        return quiz_data
-    except json.JSONDecodeError as e:
-        st.error(f"Failed to parse quiz JSON: {e}")
+        quiz = engine.get_quiz(subject, grade, num_questions, exclude=seen)
+    except Exception as e:
+        st.error(f"Failed to generate quiz: {e}")
         return []
+    seen.update(normalize_question(q['question']) for q in quiz)
+    return quiz
 
 def main():
     st.title("💯 Pariksha AI")
@@ -37,14 +25,22 @@ def main():
 
     if st.button("Generate Quiz"):
         with st.spinner("Generating quiz..."):
+            started = time.perf_counter()
             quiz = generate_quiz(subject, grade, num_questions)
             if quiz:
                 st.session_state['quiz'] = quiz
                 st.session_state['answers'] = {}
+                st.session_state['quiz_latency'] = time.perf_counter() - started
+                st.session_state['quiz_pool_size'] = engine.pool_size(subject, grade)
                 st.rerun()
 
     if 'quiz' in st.session_state:
         st.header(f"Quiz: {subject} Grade {grade}")
+        if 'quiz_latency' in st.session_state:
+            st.caption(
+                f"Served in {st.session_state['quiz_latency'] * 1000:.0f} ms · "
+                f"{st.session_state['quiz_pool_size']} questions in the pool"
+            )
         quiz = st.session_state['quiz']
         answers = st.session_state.get('answers', {})
 
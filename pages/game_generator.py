@@ -3,7 +3,7 @@ import streamlit as st
 import subprocess
 import sys
 import os
-from gamemodule.game_generator import generate_game_code
+from gamemodule.game_generator import MILESTONES, game_store, pregenerate_games, stream_game_code
 
 st.set_page_config(layout="wide")
 st.title("🎮 Kreda AI")
@@ -11,16 +11,40 @@ st.markdown("Web-Ready 2D Game Generator")
 
 st.write("Enter a context (e.g., 'waste management') to generate a playable 2D Game.")
 
+@st.cache_resource
+def start_pregeneration():
+    # Once per server process: fill the store for the configured topics in the background.
+    pregenerate_games()
+    return True
+
+start_pregeneration()
+
 context = st.text_input("Game Context", "waste management")
+regenerate = st.checkbox("Generate a new version", value=False, help="Skip the saved game for this context")
 
 if st.button("Generate Game"):
     if context:
-        code = generate_game_code(context)
-        if code:
-            st.session_state.game_code = code
-            st.success("Game code generated successfully!")
+        stored = None if regenerate else game_store.get(context)
+        if stored:
+            st.session_state.game_code = stored
+            st.success("Loaded a saved game for this context!")
         else:
-            st.error("Failed to generate game code.")
+            # Stream the generation so progress shows while the model writes, and bad output stops early
+            with st.status("Generating game...", expanded=True) as status:
+                progress_line = st.empty()
+                result = None
+                for result in stream_game_code(context):
+                    steps = " ".join(
+                        f"{'✅' if marker in result.milestones else '⏳'} `{marker}`" for marker in MILESTONES
+                    )
+                    progress_line.markdown(f"{result.bytes_received / 1024:.1f} KB received · {steps}")
+                if result is not None and result.code:
+                    game_store.put(context, result.code)
+                    st.session_state.game_code = result.code
+                    status.update(label="Game code generated successfully!", state="complete", expanded=False)
+                else:
+                    error = result.error if result is not None else "No output from the model."
+                    status.update(label=f"Failed to generate game code: {error}", state="error")
 
 # Show generated HTML game
 if 'game_code' in st.session_state:
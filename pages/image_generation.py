@@ -1,7 +1,5 @@
 import streamlit as st
 from ai_module.ai_models import ImageSceneGenerator  # Adjust if filename is different
-from PIL import Image
-import io, os
 
 # Initialize image generator once
 if "img_gen" not in st.session_state:
@@ -25,38 +23,93 @@ with s1:
 with s2:
     num_images = st.slider("🖼️ Number of images", 1, 6, 3)
     aspect_ratio = st.selectbox("📐 Aspect ratio", ["1:1", "4:3", "16:9"])
+    reuse = st.checkbox("♻️ Reuse earlier images", value=True, help="Serve matching images from the scene library instead of generating new ones")
 generate_button = st.button("🚀 Generate Images")
 
+if "generated_images" not in st.session_state:
+    st.session_state.generated_images = {}
+
+
+def show_image(slot: int, image_bytes: bytes):
+    st.image(image_bytes, caption=f"Scene {slot + 1}", use_container_width=False, width=400)
+    st.download_button(
+        label="⬇️ Download",
+        data=image_bytes,
+        file_name=f"scene_{slot + 1}.png",
+        mime="image/png",
+        key=f"download_{slot}"
+    )
+
+
 if generate_button and prompt_input.strip():
-    with st.spinner("Generating images..."):
-        try:
-            response = st.session_state.img_gen.generate_images(
+    st.session_state.generated_images = {}
+    # Grid of placeholders, filled in as each parallel request finishes
+    cols = st.columns(min(num_images, 3))
+    slots = [cols[i % len(cols)].empty() for i in range(num_images)]
+    for slot in slots:
+        slot.caption("⏳ Generating...")
+    try:
+        for i, image_bytes in st.session_state.img_gen.iter_images(
             prompt=prompt_input,
             number_of_images=num_images,
-            aspect_ratio=aspect_ratio
-        )
-            images = response.images  # list of GeneratedImage
-            st.write(f"Generated {len(images)} images.")
-            img_list = []
-            for i, img in enumerate(images):
-                img.save(f"scene_{i + 1}.png")
-                image = Image.open(f"scene_{i + 1}.png")
-                img_list.append(image)
-            # Display images in a grid
-            cols = st.columns(min(len(img_list), 3))
-            for i, img in enumerate(img_list):
-                with cols[i % len(cols)]:
-                    st.image(img, caption=f"Scene {i + 1}", use_container_width=False, width=400)
-
-                    # Download button
-                    img_bytes = io.BytesIO()
-                    img.save(img_bytes, format="PNG")
-                    st.download_button(
-                        label="⬇️ Download",
-                        data=img_bytes.getvalue(),
-                        file_name=f"scene_{i + 1}.png",
-                        mime="image/png"
-                    )
-                    os.remove(f"scene_{i + 1}.png")  # Clean up saved images after display
-        except Exception as e:
-            st.error(f"❌ Error: {str(e)}")
\ No newline at end of file
+            aspect_ratio=aspect_ratio,
+            reuse=reuse
+        ):
+            st.session_state.generated_images[i] = image_bytes
+            with slots[i].container():
+                show_image(i, image_bytes)
+        for i, slot in enumerate(slots):
+            if i not in st.session_state.generated_images:
+                slot.caption("⚠️ This image was filtered or failed.")
+        st.write(f"Generated {len(st.session_state.generated_images)} images.")
+    except Exception as e:
+        st.error(f"❌ Error: {str(e)}")
+elif st.session_state.generated_images:
+    images = sorted(st.session_state.generated_images.items())
+    cols = st.columns(min(len(images), 3))
+    for n, (i, image_bytes) in enumerate(images):
+        with cols[n % len(cols)]:
+            show_image(i, image_bytes)
+
+# Previously generated scenes, searchable by prompt
+library = st.session_state.img_gen.library
+
+
+def show_library_scene(image_hash: str):
+    """Full image and download for one scene; loaded only when the teacher opens it."""
+    image_bytes = library.image(image_hash)
+    if image_bytes is None:
+        st.caption("This scene is no longer in the library.")
+        return
+    st.image(image_bytes, width=400)
+    st.download_button(
+        label="⬇️ Download",
+        data=image_bytes,
+        file_name=f"scene_{image_hash[:8]}.png",
+        mime="image/png",
+        key=f"library_download_{image_hash}"
+    )
+
+
+# Rendered only while browsing, and only thumbnails: full images are read on request.
+if library is not None and st.toggle("📚 Browse scene library"):
+    report = library.report()
+    st.caption(f"{report['scenes']} scenes, {report['bytes_stored'] / 1e6:.1f} MB of {report['max_bytes'] / 1e9:.0f} GB")
+    query = st.text_input("Search scenes by topic", placeholder="e.g. photosynthesis")
+    scenes = library.search(query)
+    if scenes:
+        cols = st.columns(4)
+        for n, scene in enumerate(scenes):
+            with cols[n % 4]:
+                thumbnail = library.thumbnail(scene.image_hash)
+                if thumbnail:
+                    st.image(thumbnail, caption=scene.prompt.strip()[:60])
+                else:
+                    st.caption(scene.prompt.strip()[:60])
+                if st.button("🔍 Open", key=f"library_open_{scene.image_hash}"):
+                    st.session_state.library_scene = scene.image_hash
+        if st.session_state.get("library_scene"):
+            st.divider()
+            show_library_scene(st.session_state.library_scene)
+    elif query:
+        st.caption("No scenes found for this topic yet.")
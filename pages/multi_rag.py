@@ -1,12 +1,13 @@
 import streamlit as st
-import tempfile
 import asyncio
 import os
 from dotenv import load_dotenv
 
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from ai_module.ai_models import TeacherChatAgent, save_chat_history  # shared LLM + util
-from ai_module.rag_utils import extract_text_from_pdf, create_vectorstore, get_custom_rag_chain
+from ai_module.ai_models import save_chat_history
+from ai_module.agent_registry import get_teacher_agent  # shared LLM
+from ai_module.rag_utils import get_or_create_vectorstore, get_custom_rag_chain
+from ai_module.embedding_cache import get_embedding_cache
 
 # Set up asyncio loop (Python 3.11 fix)
 try:
@@ -23,7 +24,7 @@ st.set_page_config(page_title="Local-Aware RAG with Gemini", layout="centered")
 st.title("📄 RAGaBot AI")
 # Shared embeddings and LLM from agent
 embeddings = GoogleGenerativeAIEmbeddings(model="gemini-embedding-001")
-chat_agent = TeacherChatAgent()  # initializes shared LLM
+chat_agent = get_teacher_agent()  # pooled per process
 llm = chat_agent.llm
 
 # Session state for chat
@@ -34,33 +35,45 @@ if "messages" not in st.session_state:
 uploaded_pdf = st.file_uploader("📄 Upload a PDF (Telugu or Multilingual)", type=["pdf"])
 
 if uploaded_pdf:
+    # Indexes are keyed by the PDF's content, so reruns and re-uploads reuse the stored index.
     with st.spinner("Extracting and indexing PDF..."):
-        text = extract_text_from_pdf(uploaded_pdf)
+        progress = st.empty()
+        vectordb = get_or_create_vectorstore(
+            uploaded_pdf,
+            embeddings,
+            on_progress=lambda done, total: progress.caption(f"Embedded {done} chunks"),
+        )
+        progress.empty()
 
-        if not text.strip():
-            st.error("No extractable text found.")
-            st.stop()
-        st.success("PDF text extracted successfully!")
-        with tempfile.TemporaryDirectory() as tmpdir:
-            vectordb = create_vectorstore(text, embeddings, tmpdir)
-            rag_query_fn = get_custom_rag_chain(llm, vectordb)
+    if vectordb is None:
+        st.error("No extractable text found.")
+        st.stop()
+    st.success("PDF indexed successfully!")
+    report = get_embedding_cache().report()
+    st.caption(f"Embedding cache: {report['hit_rate']:.0%} hit rate, {report['bytes_stored'] / 1e6:.1f} MB stored")
+    rag_query_fn = get_custom_rag_chain(llm, vectordb)
 
-            # Display previous messages
-            for msg in st.session_state["messages"]:
-                with st.chat_message(msg["role"]):
-                    st.markdown(msg["content"])
+    with st.expander("🔎 Limit search to pages"):
+        page_cols = st.columns(2)
+        first_page = page_cols[0].number_input("From page", min_value=0, value=0, help="0 searches the whole PDF")
+        last_page = page_cols[1].number_input("To page", min_value=0, value=0)
+    page_range = (int(first_page), int(last_page)) if first_page and last_page >= first_page else None
 
-            # User input
-            if prompt := st.chat_input("Ask a question (Telugu/English/mixed)..."):
-                st.session_state["messages"].append({"role": "user", "content": prompt})
+    # Display previous messages
+    for msg in st.session_state["messages"]:
+        with st.chat_message(msg["role"]):
+            st.markdown(msg["content"])
 
-                with st.chat_message("user"):
-                    st.markdown(prompt)
+    # User input
+    if prompt := st.chat_input("Ask a question (Telugu/English/mixed)..."):
+        st.session_state["messages"].append({"role": "user", "content": prompt})
 
-                with st.chat_message("assistant"):
-                    with st.spinner("Thinking..."):
-                        lc_history = save_chat_history(st.session_state["messages"])
-                        response = rag_query_fn(prompt)
-                        st.markdown(response)
-                        st.session_state["messages"].append({"role": "assistant", "content": response})
+        with st.chat_message("user"):
+            st.markdown(prompt)
 
+        with st.chat_message("assistant"):
+            with st.spinner("Thinking..."):
+                lc_history = save_chat_history(st.session_state["messages"])
+                response = rag_query_fn(prompt, page_range=page_range)
+                st.markdown(response)
+                st.session_state["messages"].append({"role": "assistant", "content": response})
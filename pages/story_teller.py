@@ -1,34 +1,40 @@
 import streamlit as st
 from ai_module.gcloud_services import GoogleTTS
-from ai_module.ai_models import TeacherChatAgent
+from ai_module.agent_registry import get_teacher_agent
+from synthesis_ui import show_synthesis_job, synthesis_pool
 
 # Initialize agents
-llm = TeacherChatAgent()
+llm = get_teacher_agent()
 tts = GoogleTTS()
 
-# Function to generate a story based on user input
-def generate_story(query: str) -> str:
-    """Generates a story based on the user query."""
-    try:
-        # Check if query is not empty
-        if not query.strip():
-            raise ValueError("Query cannot be empty!")
-        
-        story = llm.chat("Generate a Story on the query: " + query)
-        return story
-    except Exception as e:
-        st.error(f"❌ Error generating story: {str(e)}")
-        return None
-
-# Function to handle text-to-speech synthesis
-def synthesize_speech(text: str, language_code: str = "te") -> bytes:
-    """Generates speech for a given text."""
-    try:
-        audio_data = tts.synthesize(text, language_code=language_code)
-        return audio_data
-    except Exception as e:
-        st.error(f"❌ TTS Error: {str(e)}")
-        return None
+
+# Function to stream a story based on user input
+def stream_story(query: str):
+    """Yields story tokens as they are generated; the full story lands in session state."""
+    if not query.strip():
+        raise ValueError("Query cannot be empty!")
+
+    for event in llm.stream_chat("Generate a Story on the query: " + query, use_cache=True):
+        if event.kind == "token":
+            yield event.content
+        elif event.kind == "final":
+            st.session_state['story'] = event.content
+
+# Function to start text-to-speech synthesis in the background
+def start_narration(text: str, language_code: str = "te"):
+    """Queues speech synthesis for a given text; parts are attached as they become ready."""
+    st.session_state['narration'] = tts.start_synthesis(text, synthesis_pool(), language_code=language_code)
+
+
+def show_narration():
+    job = st.session_state['narration']
+    if job is None:
+        if st.button("🔊 Narrate"):
+            start_narration(st.session_state['story'])
+            st.rerun()
+        return
+
+    show_synthesis_job(job, label="narration")
 
 # Main interaction UI
 def main():
@@ -38,11 +44,13 @@ def main():
     # Initialize session state variables if they don't exist
     if 'story' not in st.session_state:
         st.session_state['story'] = None
-    if 'audio_data' not in st.session_state:
-        st.session_state['audio_data'] = None
+    if 'narration' not in st.session_state:
+        st.session_state['narration'] = None
     if 'user_query' not in st.session_state:
         st.session_state['user_query'] = None
 
+    auto_narrate = st.toggle("Narrate stories automatically", value=True)
+
     # User input
     query = st.chat_input("Ask about a story")
 
@@ -50,44 +58,39 @@ def main():
     if query:
         # Store the query in session state
         st.session_state['user_query'] = query
+        st.session_state['story'] = None
+        st.session_state['narration'] = None
+        st.write(f"**Your Query**: {st.session_state['user_query']}")
+
+        # Stream the story so the text appears as it is written
+        st.write("**Generated Story**:")
+        try:
+            st.write_stream(stream_story(query))
+        except Exception as e:
+            st.error(f"❌ Error generating story: {str(e)}")
+
+        if st.session_state['story'] and auto_narrate:
+            start_narration(st.session_state['story'])
+    elif st.session_state['story']:
         st.write(f"**Your Query**: {st.session_state['user_query']}")
-        
-        # Generate story
-        story = generate_story(query)
-        
-        if story:
-            # Store the generated story in session state
-            st.session_state['story'] = story
-
-            # Convert story to bytes for download
-            text_bytes = story.encode('utf-8')
-
-            # Store audio data in session state
-            audio_data = synthesize_speech(story)
-            if audio_data:
-                st.session_state['audio_data'] = audio_data
-
-            # Display the user's query and the generated story
-            st.write(f"**Generated Story**:\n{st.session_state['story']}")
-
-            # Create columns for download and audio playback
-            col_dl, col_audio = st.columns([1, 1])
-
-            # Provide download option for the story text
-            with col_dl:
-                st.download_button(
-                    label="📥 Download Text",
-                    data=text_bytes,
-                    file_name="generated_story.txt",
-                    mime="text/plain"
-                )
-
-            # Provide audio playback option
-            with col_audio:
-                st.audio(st.session_state['audio_data'], format="audio/mp3")
-                # if st.button("🔊 Read Aloud"):
-                #     if st.session_state['audio_data']:
-                #         st.audio(st.session_state['audio_data'], format="audio/mp3")
+        st.write(f"**Generated Story**:\n{st.session_state['story']}")
+
+    if st.session_state['story']:
+        # Create columns for download and audio playback
+        col_dl, col_audio = st.columns([1, 1])
+
+        # Provide download option for the story text
+        with col_dl:
+            st.download_button(
+                label="📥 Download Text",
+                data=st.session_state['story'].encode('utf-8'),
+                file_name="generated_story.txt",
+                mime="text/plain"
+            )
+
+        # Audio is attached here when the background synthesis finishes
+        with col_audio:
+            show_narration()
 
 if __name__ == "__main__":
     main()
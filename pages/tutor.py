@@ -3,7 +3,8 @@ import uuid
 import time
 import datetime
 import streamlit as st
-from ai_module.ai_models import TeacherChatAgent
+from ai_module.agent_registry import get_teacher_agent
+from ai_module.response_cache import SEMANTIC_CACHE_ENABLED
 
 if "history" not in st.session_state:
     st.session_state.history = []
@@ -37,10 +38,27 @@ def save_chat_to_file(user_folder, chat_history):
 
 
 
-def generate_response(query):
-    llm = TeacherChatAgent()
-    response = llm.chat(user_input=query, history=st.session_state.history[-5::])    
-    return response       
+def stream_response(query, st_time):
+    """Yield answer tokens for st.write_stream, showing tool steps as they happen."""
+    llm = get_teacher_agent()
+    first_token = True
+    # Stand-alone first questions repeat across teachers, so those may be answered from the cache.
+    # Near-duplicate (semantic) matching is opt-in via SAHAYAK_SEMANTIC_CACHE.
+    first_turn = len(st.session_state.history) <= 1
+    events = llm.stream_chat(
+        user_input=query,
+        history=st.session_state.history[-5::],
+        use_cache=first_turn,
+        semantic_cache=first_turn and SEMANTIC_CACHE_ENABLED,
+    )
+    for event in events:
+        if event.kind == "tool_start":
+            st.caption(f"🔧 Using {event.tool}: {event.content}")
+        elif event.kind == "token":
+            if first_token:
+                st.toast(f"First token in {(time.time() - st_time):.2f} seconds")
+                first_token = False
+            yield event.content
 
 st.title("⚡ Sahayak")
 st.markdown("Ask Sahayak Anything..")
@@ -57,19 +75,15 @@ if query := st.chat_input("Ask something"):
     with st.chat_message("user"):
         st.write(query)
 
-    with st.spinner("Processing ..."):
+    with st.chat_message("assistant"):
         st_time = time.time()
         try:
-            response = generate_response(query)
+            response = st.write_stream(stream_response(query, st_time))
         except Exception as e:
             response = {'output':f'Error generating response, please try again {e}'}
-        st.toast(f"Response in {(time.time() - st_time):.2f} seconds")
+            st.write(response)
 
-    st.session_state.history.append({"role": "assistant", "content": response})
-    
-    with st.chat_message("assistant"):
-            
-        st.write(response)
+        st.session_state.history.append({"role": "assistant", "content": response})
         response_time = f"{(time.time() - st_time):.2f}"
         st.markdown(f"<p style='font-size:10px;'> Response in {response_time} seconds </p>" , unsafe_allow_html= True)
         save_chat_to_file(st.session_state.user_folder, st.session_state.history)
\ No newline at end of file
@@ -1,3 +1,4 @@
+import hashlib
 import streamlit as st
 from ai_module.ai_models import GeminiVisionQA
 
@@ -5,15 +6,58 @@ st.title("👁️‍🗨️ Netra")
 st.subheader("The Vision AI")
 qa = GeminiVisionQA()
 
+if "vision_session" not in st.session_state:
+    st.session_state["vision_session"] = None
+    st.session_state["vision_image_key"] = None
+state = st.session_state
+
 cam_on = st.toggle("Use Camera", key="use_camera", value=False)
 if cam_on:
     uploaded = st.camera_input("Take a picture of the image")
 else:
     uploaded = st.file_uploader("Upload image", type=["jpg", "jpeg", "png"])
-prompt = st.chat_input("What do you want to ask about the image?")
 
-if uploaded and prompt:
-    img_bytes = uploaded.read()
-    with st.spinner("Thinking..."):
-        answer = qa.ask_about_image(image=img_bytes, prompt_text=prompt)
-    st.write(answer)
+if uploaded:
+    # One session per image: it is prepared/uploaded once and follow-ups only send the new text.
+    image_key = hashlib.sha256(uploaded.getvalue()).hexdigest()
+    if state.vision_image_key != image_key:
+        if state.vision_session is not None:
+            state.vision_session.close()
+        with st.spinner("Preparing image..."):
+            state.vision_session = qa.start_session(uploaded)
+        state.vision_image_key = image_key
+
+    session = state.vision_session
+    for question, answer in session.history:
+        with st.chat_message("user"):
+            st.markdown(question)
+        with st.chat_message("assistant"):
+            st.markdown(answer)
+
+    with st.expander("Ask several questions at once"):
+        batch = st.text_area("One question per line", key="vision_batch")
+        if st.button("Answer all") and batch.strip():
+            try:
+                with st.spinner("Thinking..."):
+                    session.ask_many(batch.splitlines())
+            except Exception as e:
+                st.error(f"❌ Error: {str(e)}")
+            else:
+                st.rerun()
+
+    if prompt := st.chat_input("What do you want to ask about the image?"):
+        with st.chat_message("user"):
+            st.markdown(prompt)
+        try:
+            with st.spinner("Thinking..."):
+                answer = session.ask(prompt)
+            with st.chat_message("assistant"):
+                st.markdown(answer)
+        except Exception as e:
+            st.error(f"❌ Error: {str(e)}")
+else:
+    st.chat_input("What do you want to ask about the image?", disabled=True)
+    if state.vision_session is not None:
+        state.vision_session.close()
+    state.vision_session = None
+    state.vision_image_key = None
@@ -0,0 +1,33 @@
+import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_module.gcloud_services import SynthesisJob
+
+
+@st.cache_resource
+def synthesis_pool() -> ThreadPoolExecutor:
+    """Shared by all pages and sessions; speech synthesis runs here so pages stay responsive."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="tts")
+
+
+def show_synthesis_job(job: SynthesisJob, label: str = "audio"):
+    """Play each part of a synthesis job as soon as it is ready; `label` names it while pending."""
+    # Poll only while parts are pending; once all are ready the whole page reruns without polling.
+    polling = not job.done()
+
+    @st.fragment(run_every=1 if polling else None)
+    def synthesis_status():
+        if polling and job.done():
+            st.rerun()
+        # Long texts are synthesized in parts; each part can be played as soon as it is ready.
+        segments = list(job.segments)
+        for i, segment in enumerate(segments):
+            if job.total > 1:
+                st.caption(f"Part {i + 1} of {job.total}")
+            st.audio(segment, format="audio/mp3")
+        if not job.done():
+            st.caption(f"🎙️ Preparing {label}..." if not segments else "🎙️ Preparing the next part...")
+        elif job.error() is not None:
+            st.error(f"❌ TTS Error: {str(job.error())}")
+
+    synthesis_status()
@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# Keep cache files out of the working tree, and let modules that build clients at import time load.
+os.environ.setdefault("SAHAYAK_CACHE_DIR", tempfile.mkdtemp(prefix="sahayak_test_cache_"))
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+pytest.importorskip("langchain_google_genai")
+
+from gamemodule.game_generator import FenceStripper, remove_code_fences
+
+SAMPLES = [
+    "<!DOCTYPE html>\n<html>\n<body></body>\n</html>",
+    "```html\n<html>\n\n<script>\nlet x = 1;\n</script>\n</html>\n```\n",
+    "Here is your game:\n\n```\n<html>\n  \n</html>\n```\nEnjoy!",
+    "a\r\nb\r\n```\r\nc\r\n```",
+    "a\rb\r```\rc\r\r```\r",
+    "```\r\n\r\nx\r\n\r\n```\r\n\r\n",
+    "line other\x85third\x0bfourth\x0cfifth\x1csixth",
+    "no newline at all",
+    "",
+    "\n\n\n",
+    "```js\nconst s = `template`;\n```\ntrailing\n",
+]
+
+
+def stream(text, cuts):
+    stripper = FenceStripper()
+    pieces, start = [], 0
+    for cut in sorted(cuts) + [len(text)]:
+        pieces.append(stripper.feed(text[start:cut]))
+        start = cut
+    pieces.append(stripper.finish())
+    return "".join(pieces)
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_whole_input_matches_remove_code_fences(text):
+    assert stream(text, []) == remove_code_fences(text)
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_single_character_chunks_match_remove_code_fences(text):
+    assert stream(text, range(1, len(text))) == remove_code_fences(text)
+
+
+def test_random_chunking_matches_remove_code_fences():
+    rng = random.Random(0)
+    alphabet = ["a", "b", " ", "\n", "\r", "\r\n", "```", "```html", "\t", " ", "<html>"]
+    for _ in range(2000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        cuts = rng.sample(range(1, len(text)), k=rng.randint(0, max(0, len(text) - 1))) if len(text) > 1 else []
+        assert stream(text, cuts) == remove_code_fences(text), repr(text)
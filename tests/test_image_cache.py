@@ -0,0 +1,110 @@
+import io
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+from ai_module.image_cache import BKTree, PerceptualCache, dhash, hamming
+
+STUDENTS = range(2, 12)
+
+
+def answer_sheet(student: int, shift: int = 0, quality: int = 90, scale: float = 1.0) -> bytes:
+    """A page printed from one template (header, numbered lines) with a student's answers written in."""
+    img = Image.new("L", (1200, 1600), 255)
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([40, 40, 1160, 200], outline=0, width=6)
+    draw.rectangle([60, 60, 600, 120], fill=0)
+    for i in range(12):
+        y = 260 + i * 110
+        draw.rectangle([60, y, 110, y + 30], fill=0)
+        draw.line([140, y + 80, 1140, y + 80], fill=0, width=3)
+    rng = random.Random(student)
+    for i in range(12):
+        y, x = 260 + i * 110, 150
+        for _ in range(rng.randint(2, 6)):
+            width = rng.randint(20, 80)
+            draw.rectangle([x + shift, y + 45, x + width + shift, y + 70], fill=90)
+            x += width + 15
+    img = img.resize((int(1200 * scale), int(1600 * scale)))
+    buffer = io.BytesIO()
+    img.convert("RGB").save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def recapture(student: int) -> bytes:
+    return answer_sheet(student, shift=6, quality=60, scale=0.7)
+
+
+def test_templated_sheets_are_close_in_the_coarse_hash():
+    # The reason OCR defaults to exact matching: different students' sheets
+    # can be as close as a recapture of the same sheet.
+    original = dhash(answer_sheet(1))
+    assert min(hamming(original, dhash(answer_sheet(s))) for s in STUDENTS) <= 24
+
+
+def test_ocr_cache_defaults_to_exact_bytes(tmp_path):
+    cache = PerceptualCache("ocr", path=str(tmp_path / "ocr.sqlite"))
+    assert not cache.near_duplicates
+    sheet = answer_sheet(1)
+    cache.store_result(cache.image_key(sheet), "", {"text": "student 1"})
+
+    assert cache.lookup(cache.image_key(sheet)) == {"text": "student 1"}
+    for student in STUDENTS:
+        assert cache.lookup(cache.image_key(answer_sheet(student))) is None
+    assert cache.lookup(cache.image_key(recapture(1))) is None
+
+
+def test_near_matches_are_verified_with_the_fine_hash(tmp_path):
+    cache = PerceptualCache("ocr", path=str(tmp_path / "ocr.sqlite"), max_distance=24)
+    cache.store_result(cache.image_key(answer_sheet(1)), "", {"text": "student 1"})
+
+    assert cache.lookup(cache.image_key(recapture(1))) == {"text": "student 1"}
+    for student in STUDENTS:
+        assert cache.lookup(cache.image_key(answer_sheet(student))) is None
+    assert cache.stats.as_dict()["near_rejected"] > 0
+
+
+def test_results_are_per_prompt(tmp_path):
+    cache = PerceptualCache("vision", path=str(tmp_path / "vision.sqlite"))
+    key = cache.image_key(answer_sheet(1))
+    cache.store_result(key, "What is question 1?", {"text": "a"})
+
+    assert cache.lookup(key, "what is  question 1?") == {"text": "a"}
+    assert cache.lookup(key, "What is question 2?") is None
+
+
+def test_eviction_does_not_rebuild_on_every_store(tmp_path, monkeypatch):
+    cache = PerceptualCache("vision", path=str(tmp_path / "vision.sqlite"), max_entries=4, rebuild_every=8)
+    rebuilds = []
+    monkeypatch.setattr(cache, "_rebuild", lambda: rebuilds.append(1))
+    sheets = [answer_sheet(s) for s in range(1, 13)]
+    for i, sheet in enumerate(sheets):
+        cache.store_result(cache.image_key(sheet), "", {"text": str(i)})
+
+    assert len(rebuilds) == 1
+    assert cache.lookup(cache.image_key(sheets[-1])) == {"text": "11"}
+    # Evicted entries are still in the tree but are skipped on lookup.
+    assert cache.lookup(cache.image_key(sheets[0])) is None
+
+
+def test_rebuild_drops_evicted_hashes(tmp_path):
+    cache = PerceptualCache("vision", path=str(tmp_path / "vision.sqlite"), max_entries=4, rebuild_every=1000)
+    for s in range(1, 10):
+        cache.store_result(cache.image_key(answer_sheet(s)), "", {"text": str(s)})
+    assert len(cache._tree) == 9
+
+    cache._rebuild()
+    assert len(cache._tree) == 4
+
+
+@pytest.mark.parametrize("radius", [0, 3, 40])
+def test_bktree_matches_brute_force(radius):
+    rng = random.Random(radius)
+    values = [rng.getrandbits(64) for _ in range(500)]
+    tree = BKTree()
+    for value in values:
+        tree.add(value)
+    query = values[7] ^ 0b101
+    expected = sorted((hamming(query, v), v) for v in set(values) if hamming(query, v) <= radius)
+    assert tree.search(query, radius) == expected
@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("google.cloud.vision")
+
+from ai_module.gcloud_services import GoogleOCR
+from ai_module.image_cache import PerceptualCache
+
+
+@pytest.fixture
+def ocr(tmp_path):
+    # Skip __init__: no credentials or API client are needed to exercise the cache.
+    ocr = GoogleOCR.__new__(GoogleOCR)
+    ocr.cache = PerceptualCache("ocr", path=str(tmp_path / "ocr.sqlite"))
+    return ocr
+
+
+def test_empty_text_is_not_cached(ocr):
+    key, cached = ocr._cached(b"blank page")
+    assert cached is None
+    ocr._remember(key, {"text": "", "locale": None, "error": None})
+    assert ocr._cached(b"blank page")[1] is None
+
+
+def test_errors_are_not_cached(ocr):
+    key, _ = ocr._cached(b"page")
+    ocr._remember(key, {"text": "partial", "locale": None, "error": "quota"})
+    assert ocr._cached(b"page")[1] is None
+
+
+def test_text_is_cached_by_exact_bytes(ocr):
+    key, _ = ocr._cached(b"page")
+    ocr._remember(key, {"text": "hello", "locale": "en", "error": None})
+    cached = ocr._cached(b"page")[1]
+    assert cached["text"] == "hello" and cached["cached"]
+    assert ocr._cached(b"page 2")[1] is None